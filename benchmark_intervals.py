@@ -6,6 +6,12 @@ Simple analysis: compare coordinate precision at different interval_days
 import subprocess
 import tempfile
 import os
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# .eph header: magic (4s) + version (I), then num_bodies (I) + num_intervals (I)
+_HEADER = struct.Struct('<II')
 
 print("=" * 80)
 print("PRECISION vs FILE SIZE ANALYSIS")
@@ -16,12 +22,10 @@ intervals = [4, 8, 16, 32, 64]
 bsp_file = 'data/ephemerides/epm/2021/spice/epm2021.bsp'
 bodies = '10,399,301'  # Sun, Earth, Moon
 
-results = []
-
-for interval in intervals:
-    print(f"\nTesting interval_days = {interval}...")
 
-    # Create temporary file
+def run_one(interval):
+    """Convert with the given interval_days; return (record or None, stderr)"""
+    # One temporary file per conversion so parallel runs never collide
     with tempfile.NamedTemporaryFile(suffix='.eph', delete=False) as tmp:
         tmp_path = tmp.name
 
@@ -34,35 +38,54 @@ for interval in intervals:
             '--interval', str(interval)
         ]
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        # Progress output on stdout is discarded rather than buffered in
+        # memory; only stderr is kept for the failure message
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True, timeout=60)
 
-        if result.returncode == 0 and os.path.exists(tmp_path):
-            size = os.path.getsize(tmp_path) / 1024 / 1024  # MB
+        if result.returncode != 0 or not os.path.exists(tmp_path):
+            return None, result.stderr
 
-            # Count intervals
-            with open(tmp_path, 'rb') as f:
-                f.seek(12)  # Skip magic + version
-                import struct
-                num_bodies = struct.unpack('<I', f.read(4))[0]
-                num_intervals = struct.unpack('<I', f.read(4))[0]
+        size = os.path.getsize(tmp_path) / 1024 / 1024  # MB
 
-            results.append({
-                'interval': interval,
-                'size_mb': size,
-                'intervals': num_intervals,
-                'bodies': num_bodies
-            })
+        # Count intervals
+        with open(tmp_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            num_bodies, num_intervals = _HEADER.unpack_from(mm, 8)  # Skip magic + version
 
-            print(f"  ✅ Size: {size:.2f} MB, Intervals: {num_intervals}")
-        else:
-            print(f"  ❌ Conversion failed")
-            if result.stderr:
-                print(f"     Error: {result.stderr[:200]}")
+        return {
+            'interval': interval,
+            'size_mb': size,
+            'intervals': num_intervals,
+            'bodies': num_bodies
+        }, None
+
+    except subprocess.TimeoutExpired:
+        return None, 'timeout after 60 s'
 
     finally:
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
 
+
+# Conversions are independent external processes: run them concurrently.
+# Threads are enough since each worker just waits on its subprocess, and
+# a finished worker parses its header while the others are still converting.
+print(f"\nConverting with interval_days = {intervals} in parallel...")
+results = []
+max_workers = min(len(intervals), os.cpu_count() or 1)
+
+with ThreadPoolExecutor(max_workers=max_workers) as ex:
+    for interval, (record, error) in zip(intervals, ex.map(run_one, intervals)):
+        print(f"\nTesting interval_days = {interval}...")
+        if record is not None:
+            results.append(record)
+            print(f"  ✅ Size: {record['size_mb']:.2f} MB, Intervals: {record['intervals']}")
+        else:
+            print(f"  ❌ Conversion failed")
+            if error:
+                print(f"     Error: {error[:200]}")
+
 print("\n" + "=" * 80)
 print("RESULTS SUMMARY")
 print("=" * 80)
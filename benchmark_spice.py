@@ -2,34 +2,83 @@
 """
 SPICE BSP Performance Benchmark
 Tests original EPM2021 SPICE file performance
+
+Usage: python benchmark_spice.py [--legacy] [--cold]
+  --legacy  Use the per-JD sp.spkgps loop instead of the cyice batch call
+  --cold    Also time kernel loading after dropping the OS page cache
+            (Linux only, requires root)
 """
 
 import spiceypy as sp
+import os
 import time
 import numpy as np
 import sys
 import json
 
+try:
+    import orjson
+
+    def _dumps(data):
+        return orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+except ImportError:
+    def _dumps(data):
+        return json.dumps(data, indent=2)
+
+try:
+    from spiceypy import cyice  # SpiceyPy >= 7.0 (Cython, vectorized *_v APIs)
+except ImportError:
+    cyice = None
+
 # Configuration
 SPICE_FILE = 'data/ephemerides/epm/2021/spice/epm2021.bsp'
 BODY_ID = 399  # Earth
 ITERATIONS = 1000
 J2000_JD = 2451545.0
 
+# --legacy keeps the original per-JD sp.spkgps loop for comparison
+LEGACY = '--legacy' in sys.argv or cyice is None
+COLD = '--cold' in sys.argv
+
 # Load SPICE kernel
 sp.furnsh(SPICE_FILE)
 
+AU_INV = 1.0 / 149597870.7  # km -> AU
+BODY_ID_INT = int(BODY_ID)
+
 def jd_to_et(jd):
-    """Convert Julian Date to Ephemeris Time"""
+    """Convert Julian Date (scalar or array) to Ephemeris Time"""
     return (jd - J2000_JD) * 86400.0
 
-def compute_position(body_id, jd):
-    """Compute position at given JD"""
-    et = jd_to_et(jd)
+def warm_page_cache(path):
+    """Pull the whole kernel file into the OS page cache"""
+    with open(path, 'rb') as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while f.read(1 << 24):
+            pass
+
+def drop_page_cache():
+    """Flush the OS page cache; returns False if not permitted/supported"""
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+def compute_position(body_id, et):
+    """Compute position (km) at given ET"""
     state, _ = sp.spkgps(body_id, et, 'J2000', 0)
-    # Convert km to AU
-    pos_au = [x / 149597870.7 for x in state[:3]]
-    return pos_au
+    return state[:3]
+
+def compute_positions(body_id, ets):
+    """Compute positions (km) for an array of ETs in one vectorized SPICE call"""
+    states, _ = cyice.spkgps_v(body_id, ets, 'J2000', 0)
+    return np.asarray(states)[:, :3]
 
 # Generate test data
 np.random.seed(42)
@@ -38,15 +87,32 @@ end_jd = 2530000.5
 random_jds = np.random.uniform(start_jd, end_jd, ITERATIONS)
 sequential_jds = np.arange(J2000_JD, J2000_JD + ITERATIONS, 1.0)
 
+# Convert once, outside the timed loops
+random_ets = np.ascontiguousarray(jd_to_et(random_jds), dtype=np.float64)
+sequential_ets = np.ascontiguousarray(jd_to_et(sequential_jds), dtype=np.float64)
+
 results = {
     'format': 'SPICE BSP (Original)',
+    'mode': 'legacy' if LEGACY else 'cyice',
     'file_size_mb': 147.13,
     'body_id': BODY_ID,
     'iterations': ITERATIONS
 }
 
 # Test 1: Initialization (kernel loading)
+if COLD:
+    print("Testing SPICE initialization (cold cache)...", file=sys.stderr)
+    sp.kclear()
+    if drop_page_cache():
+        start = time.time()
+        sp.furnsh(SPICE_FILE)
+        results['cold_init_time_ms'] = (time.time() - start) * 1000
+    else:
+        print("  Cannot drop page cache (needs root on Linux), skipped", file=sys.stderr)
+
+# Warm the page cache so the timing measures the SPICE loader, not disk I/O
 print("Testing SPICE initialization...", file=sys.stderr)
+warm_page_cache(SPICE_FILE)
 start = time.time()
 sp.kclear()
 sp.furnsh(SPICE_FILE)
@@ -56,7 +122,7 @@ results['init_time_ms'] = init_time_ms
 # Test 2: Single computation (J2000.0)
 print("Testing single computation...", file=sys.stderr)
 start = time.time()
-pos = compute_position(BODY_ID, J2000_JD)
+pos = compute_position(BODY_ID_INT, jd_to_et(J2000_JD)) * AU_INV
 single_time_ms = (time.time() - start) * 1000
 results['single_time_ms'] = single_time_ms
 results['single_pos_x'] = pos[0]
@@ -64,8 +130,11 @@ results['single_pos_x'] = pos[0]
 # Test 3: Random access
 print(f"Testing random access ({ITERATIONS} iterations)...", file=sys.stderr)
 start = time.time()
-for jd in random_jds:
-    compute_position(BODY_ID, jd)
+if LEGACY:
+    for et in random_ets.tolist():
+        compute_position(BODY_ID_INT, et)
+else:
+    random_pos = compute_positions(BODY_ID_INT, random_ets) * AU_INV
 random_time_ms = (time.time() - start) * 1000
 results['random_total_ms'] = random_time_ms
 results['random_avg_ms'] = random_time_ms / ITERATIONS
@@ -74,14 +143,17 @@ results['random_ops_per_sec'] = int(ITERATIONS / (random_time_ms / 1000))
 # Test 4: Sequential access
 print(f"Testing sequential access ({ITERATIONS} iterations)...", file=sys.stderr)
 start = time.time()
-for jd in sequential_jds:
-    compute_position(BODY_ID, jd)
+if LEGACY:
+    for et in sequential_ets.tolist():
+        compute_position(BODY_ID_INT, et)
+else:
+    seq_pos = compute_positions(BODY_ID_INT, sequential_ets) * AU_INV
 seq_time_ms = (time.time() - start) * 1000
 results['seq_total_ms'] = seq_time_ms
 results['seq_avg_ms'] = seq_time_ms / ITERATIONS
 results['seq_ops_per_sec'] = int(ITERATIONS / (seq_time_ms / 1000))
 
 # Output results as JSON
-print(json.dumps(results, indent=2))
+print(_dumps(results))
 
 sp.kclear()
@@ -5,9 +5,24 @@ Comprehensive Ephemeris Data Inventory
 в JPL DE, EPM и Swiss Ephemeris
 """
 
+import os
+import struct
 import sys
 from pathlib import Path
 
+MB = 1 << 20
+
+# JPL DE binary header: 3 ASCII title lines of 84 chars each
+_DE_TITLE = struct.Struct('84s84s84s')
+
+
+def try_stat(path):
+    """os.stat() result for path, or None if it does not exist"""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
 print("=" * 80)
 print("COMPREHENSIVE EPHEMERIS INVENTORY")
 print("=" * 80)
@@ -22,19 +37,19 @@ print("=" * 80)
 jpl_de440_path = Path("data/ephemerides/jpl/de440/linux_p1550p2650.440")
 jpl_de441_path = Path("data/ephemerides/jpl/de441/linux_m13000p17000.441")
 
-if jpl_de440_path.exists():
+de440_stat = try_stat(jpl_de440_path)
+if de440_stat:
     print(f"\n✅ DE440 found: {jpl_de440_path}")
-    print(f"   Size: {jpl_de440_path.stat().st_size / 1024 / 1024:.2f} MB")
+    print(f"   Size: {de440_stat.st_size / MB:.2f} MB")
 
     # Read header to get body list
     try:
-        import struct
         with open(jpl_de440_path, 'rb') as f:
             # JPL header format (ASCII labels)
-            header = f.read(84 * 3)  # 3 lines of 84 chars each
+            titles = _DE_TITLE.unpack(f.read(_DE_TITLE.size))
             print("\n   Header info:")
-            for i in range(3):
-                line = header[i*84:(i+1)*84].decode('ascii', errors='ignore').strip()
+            for raw in titles:
+                line = raw.decode('ascii', errors='ignore').strip()
                 if line:
                     print(f"   {line}")
 
@@ -71,9 +86,10 @@ if jpl_de440_path.exists():
 else:
     print(f"\n❌ DE440 not found: {jpl_de440_path}")
 
-if jpl_de441_path.exists():
+de441_stat = try_stat(jpl_de441_path)
+if de441_stat:
     print(f"\n✅ DE441 found: {jpl_de441_path}")
-    print(f"   Size: {jpl_de441_path.stat().st_size / 1024 / 1024:.2f} MB")
+    print(f"   Size: {de441_stat.st_size / MB:.2f} MB")
     print("   Same bodies as DE440, extended time range (-13200 to +17191)")
 else:
     print(f"\n❌ DE441 not found: {jpl_de441_path}")
@@ -87,9 +103,10 @@ print("=" * 80)
 
 epm_bsp_path = Path("data/ephemerides/epm/2021/spice/epm2021.bsp")
 
-if epm_bsp_path.exists():
+epm_bsp_stat = try_stat(epm_bsp_path)
+if epm_bsp_stat:
     print(f"\n✅ EPM2021 BSP found: {epm_bsp_path}")
-    print(f"   Size: {epm_bsp_path.stat().st_size / 1024 / 1024:.2f} MB")
+    print(f"   Size: {epm_bsp_stat.st_size / MB:.2f} MB")
 
     try:
         # Try to read SPICE BSP file
@@ -115,13 +132,18 @@ if epm_bsp_path.exists():
                 301: "Moon", 399: "Earth"
             }
 
+            # Collect stored targets once from the position records
+            # (1-based index) instead of probing each body with compute()
+            available = {
+                eph.getpositionrecordindex(i)[0]
+                for i in range(1, eph.getpositionrecordcount() + 1)
+            }
+
             for body_id in bodies:
                 name = body_names.get(body_id, f"Body {body_id}")
-                try:
-                    # Try to compute position to verify availability
-                    pos = eph.compute(body_id, 0, 2451545.0, calceph.Constants.USEUNIT_AU)
+                if body_id in available:
                     print(f"   ✅ {body_id:3d}: {name}")
-                except:
+                else:
                     print(f"   ❌ {body_id:3d}: {name} (not available)")
 
             print("\n   Coordinate systems:")
@@ -158,15 +180,23 @@ print("=" * 80)
 sweph_dll = Path("vendor/swisseph/swedll64.dll")
 sweph_ephe = Path("ephe")
 
-if sweph_dll.exists() and sweph_ephe.exists():
+sweph_dll_stat = try_stat(sweph_dll)
+sweph_ephe_stat = try_stat(sweph_ephe)
+
+if sweph_dll_stat and sweph_ephe_stat:
     print(f"\n✅ Swiss Ephemeris found")
     print(f"   DLL: {sweph_dll}")
     print(f"   Data: {sweph_ephe}")
 
-    # Count .se1 files
-    se1_files = list(sweph_ephe.glob("*.se1"))
-    total_size = sum(f.stat().st_size for f in se1_files)
-    print(f"   Files: {len(se1_files)} .se1 files ({total_size / 1024 / 1024:.2f} MB)")
+    # Count .se1 files and their total size in a single directory pass
+    se1_count = 0
+    total_size = 0
+    with os.scandir(sweph_ephe) as entries:
+        for entry in entries:
+            if entry.name.endswith('.se1') and entry.is_file():
+                se1_count += 1
+                total_size += entry.stat().st_size
+    print(f"   Files: {se1_count} .se1 files ({total_size / MB:.2f} MB)")
 
     print("\n   Available bodies (MAIN PLANETS):")
     print("   - Sun (0, SE_SUN)")
@@ -219,8 +249,8 @@ if sweph_dll.exists() and sweph_ephe.exists():
 
 else:
     print(f"\n❌ Swiss Ephemeris not found")
-    print(f"   DLL: {sweph_dll} - {'exists' if sweph_dll.exists() else 'missing'}")
-    print(f"   Data: {sweph_ephe} - {'exists' if sweph_ephe.exists() else 'missing'}")
+    print(f"   DLL: {sweph_dll} - {'exists' if sweph_dll_stat else 'missing'}")
+    print(f"   Data: {sweph_ephe} - {'exists' if sweph_ephe_stat else 'missing'}")
 
 # ============================================================================
 # 4. Summary & Recommendations
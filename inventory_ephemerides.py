@@ -6,93 +6,86 @@ Complete inventory of SPICE ephemeris files:
 - File size and body count
 
 Simple and reliable - works with jplephem's actual API.
+Reads only DAF summary records; use --full for native intervals and
+polynomial degrees (the inventory_spice.py scan).
 """
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List
+from typing import List
 import argparse
 
+import numpy as np
+
 try:
-    from jplephem.spk import SPK
+    import jplephem  # noqa: F401 - used by spk_scan
 except ImportError:
     print("ERROR: jplephem not installed. Run: pip install jplephem", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent / 'tools'))
+import inventory_cache
+from inventory_cache import cached
+from body_names import BODY_NAMES, PLANET_IDS, BARYCENTER_IDS, ASTEROID_RANGE
+from spk_scan import scan_segments
 
-BODY_NAMES = {
-    # Planets
-    1: "Mercury", 2: "Venus", 3: "EMB", 4: "Mars",
-    5: "Jupiter", 6: "Saturn", 7: "Uranus", 8: "Neptune", 9: "Pluto",
-    10: "Sun", 301: "Moon", 399: "Earth",
-
-    # Barycenters
-    199: "Mercury Barycenter", 299: "Venus Barycenter",
 
-    # Main belt asteroids
-    2000001: "1 Ceres", 2000002: "2 Pallas", 2000003: "3 Juno", 2000004: "4 Vesta",
-    2000007: "7 Iris", 2000010: "10 Hygiea", 2000015: "15 Eunomia",
-    2000016: "16 Psyche", 2000324: "324 Bamberga",
+# One record per segment (SoA-friendly structured array)
+SEGMENT_DTYPE = np.dtype([
+    ('target', 'i8'),
+    ('target_name', 'U35'),
+    ('center', 'i4'),
+    ('coverage_years', 'f8'),
+    ('start_jd', 'f8'),
+    ('end_jd', 'f8'),
+    ('start_year', 'f8'),
+    ('end_year', 'f8'),
+])
 
-    # TNOs/Centaurs/Dwarf planets
-    2002060: "2060 Chiron", 2005145: "5145 Pholus",
-    2090377: "90377 Sedna",
-    2136108: "136108 Haumea",
-    2136199: "136199 Eris",
-    2136472: "136472 Makemake",
 
-    # SSB
-    0: "Solar System Barycenter",
-    1000000001: "Pluto-Charon Barycenter",
-}
+@cached('inventory_ephemerides', fmt='npy')
+def scan_file(filepath: str) -> np.ndarray:
+    """Collect target and coverage of every segment in a SPICE file"""
 
+    results, _, _ = scan_segments(filepath, SEGMENT_DTYPE)
+    results['start_year'] = 2000.0 + (results['start_jd'] - 2451545.0) / 365.25
+    results['end_year'] = 2000.0 + (results['end_jd'] - 2451545.0) / 365.25
 
-def analyze_file(filepath: str):
-    """Analyze a single SPICE file"""
-
-    path = Path(filepath)
-    print(f"\n{'='*100}")
-    print(f"File: {path.name}")
-    print(f"Path: {filepath}")
-    print(f"Size: {path.stat().st_size / 1024 / 1024:.1f} MB")
-    print(f"{'='*100}\n")
-
-    kernel = SPK.open(filepath)
-
-    print(f"{'ID':<6} {'Body Name':<35} {'Coverage':<35} {'Years':<8}")
-    print(f"{'-'*6} {'-'*35} {'-'*35} {'-'*8}")
+    return results
 
-    results = []
 
-    for seg in kernel.segments:
-        target_id = seg.target
-        target_name = BODY_NAMES.get(target_id, f"Body {target_id}")
+def analyze_file(filepath: str, results: np.ndarray = None):
+    """Analyze a single SPICE file (pass `results` if it was already scanned)"""
 
-        # Coverage
-        duration_days = seg.end_jd - seg.start_jd
-        coverage_years = duration_days / 365.25
+    path = Path(filepath)
+    st = path.stat()
 
-        # Get time range
-        start_year = 2000 + (seg.start_jd - 2451545.0) / 365.25
-        end_year = 2000 + (seg.end_jd - 2451545.0) / 365.25
-        coverage_str = f"{start_year:.0f} to {end_year:.0f} AD"
+    if results is None:
+        results = scan_file(filepath)
 
-        print(f"{target_id:<6} {target_name:<35} {coverage_str:<35} {coverage_years:.0f}")
+    # Build the whole report and write it with one call instead of one
+    # print() (and write syscall) per segment
+    out = [
+        f"\n{'='*100}",
+        f"File: {path.name}",
+        f"Path: {filepath}",
+        f"Size: {st.st_size / 1024 / 1024:.1f} MB",
+        f"{'='*100}\n",
+        f"{'ID':<6} {'Body Name':<35} {'Coverage':<35} {'Years':<8}",
+        f"{'-'*6} {'-'*35} {'-'*35} {'-'*8}",
+    ]
+    emit = out.append
 
-        results.append({
-            'target': target_id,
-            'target_name': target_name,
-            'center': seg.center,
-            'coverage_years': coverage_years,
-            'start_jd': seg.start_jd,
-            'end_jd': seg.end_jd,
-            'start_year': start_year,
-            'end_year': end_year,
-        })
+    for r in results:
+        coverage_str = f"{r['start_year']:.0f} to {r['end_year']:.0f} AD"
+        emit(f"{r['target']:<6} {r['target_name']:<35} {coverage_str:<35} {r['coverage_years']:.0f}")
 
-    kernel.close()
+    emit(f"\nTotal bodies: {len(results)}")
 
-    print(f"\nTotal bodies: {len(results)}")
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
     return results
 
@@ -101,39 +94,57 @@ def compare_files(files: List[str]):
     """Compare multiple files"""
 
     all_results = {}
+    targets_by_file = {}  # filepath -> set of target IDs
 
+    paths = {}  # filepath -> Path, built once per file
     for filepath in files:
-        if not Path(filepath).exists():
+        path = Path(filepath)
+        if not path.exists():
             print(f"⚠️  File not found: {filepath}")
             continue
-
-        results = analyze_file(filepath)
+        paths[filepath] = path
+    existing = list(paths)
+
+    # Files are independent: scan them in parallel worker processes
+    scanned = {}
+    if existing:
+        max_workers = min(len(existing), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=inventory_cache.set_enabled,
+                                 initargs=(inventory_cache.enabled,)) as ex:
+            futures = {ex.submit(scan_file, fp): fp for fp in existing}
+            for fut in as_completed(futures):
+                scanned[futures[fut]] = fut.result()
+
+    # Reports are printed by the parent, in command-line order
+    for filepath in existing:
+        results = analyze_file(filepath, scanned[filepath])
         all_results[filepath] = results
 
+        targets_by_file[filepath] = set(np.unique(results['target']).tolist())
+
     # Cross-file comparison
     if len(all_results) > 1:
         print(f"\n\n{'='*100}")
         print("CROSS-FILE COMPARISON")
         print(f"{'='*100}\n")
 
-        # Collect all unique targets
+        # Collect all unique targets (and resolve their names once)
         all_targets = set()
-        for results in all_results.values():
-            for r in results:
-                all_targets.add(r['target'])
+        for file_targets in targets_by_file.values():
+            all_targets.update(file_targets)
+        target_names = {t: BODY_NAMES.get(t, f"Body {t}") for t in all_targets}
 
         # Header
-        file_cols = [Path(f).stem[:20] for f in all_results.keys()]
+        file_cols = [paths[f].stem[:20] for f in all_results.keys()]
         print(f"{'Body':<35} " + " | ".join(f"{col:<12}" for col in file_cols))
         print(f"{'-'*35} " + "-+-".join("-"*12 for _ in file_cols))
 
         for target_id in sorted(all_targets):
-            target_name = BODY_NAMES.get(target_id, f"Body {target_id}")[:35]
-            row = [target_name]
+            row = [target_names[target_id][:35]]
 
-            for filepath, results in all_results.items():
-                target_data = [r for r in results if r['target'] == target_id]
-                if target_data:
+            for file_targets in targets_by_file.values():
+                if target_id in file_targets:
                     val = "✓"
                 else:
                     val = "—"
@@ -147,43 +158,45 @@ def compare_files(files: List[str]):
         print(f"{'='*100}\n")
 
         for filepath, results in all_results.items():
-            fname = Path(filepath).name
+            fname = paths[filepath].name
             print(f"\n{fname}:")
             print(f"  Bodies: {len(results)}")
 
-            # Group by category
-            planets = [r for r in results if r['target'] in [1,2,3,4,5,6,7,8,9,10,301,399]]
-            barycenters = [r for r in results if r['target'] in [199,299,0,1000000001]]
-            asteroids = [r for r in results if 2000000 <= r['target'] < 3000000]
-            tno_centaurs = [r for r in results if r['target'] > 2000000 and r['target'] not in [t['target'] for t in asteroids]]
+            # Group by category (boolean masks over the target column)
+            targets = results['target']
+            asteroid_mask = (targets >= ASTEROID_RANGE.start) & (targets < ASTEROID_RANGE.stop)
+            planets = targets[np.isin(targets, list(PLANET_IDS))]
+            barycenters = targets[np.isin(targets, list(BARYCENTER_IDS))]
+            asteroids = targets[asteroid_mask]
+            tno_centaurs = targets[(targets > ASTEROID_RANGE.start) & ~asteroid_mask]
 
-            if planets:
+            if planets.size:
                 print(f"    Planets/Sun/Moon: {len(planets)}")
-                planet_ids = ",".join(str(r['target']) for r in planets)
+                planet_ids = ",".join(map(str, planets.tolist()))
                 print(f"      IDs: {planet_ids}")
 
-            if barycenters:
+            if barycenters.size:
                 print(f"    Barycenters: {len(barycenters)}")
-                barycenter_ids = ",".join(str(r['target']) for r in barycenters)
+                barycenter_ids = ",".join(map(str, barycenters.tolist()))
                 print(f"      IDs: {barycenter_ids}")
 
-            if asteroids:
+            if asteroids.size:
                 print(f"    Asteroids: {len(asteroids)}")
-                asteroid_ids = ",".join(str(r['target']) for r in asteroids[:10])  # First 10
+                asteroid_ids = ",".join(map(str, asteroids[:10].tolist()))  # First 10
                 if len(asteroids) > 10:
                     print(f"      IDs: {asteroid_ids},... ({len(asteroids)} total)")
                 else:
                     print(f"      IDs: {asteroid_ids}")
 
-            if tno_centaurs:
+            if tno_centaurs.size:
                 print(f"    TNOs/Centaurs: {len(tno_centaurs)}")
-                tno_ids = ",".join(str(r['target']) for r in tno_centaurs)
+                tno_ids = ",".join(map(str, tno_centaurs.tolist()))
                 print(f"      IDs: {tno_ids}")
 
             # Coverage
-            if results:
-                min_year = min(r['start_year'] for r in results)
-                max_year = max(r['end_year'] for r in results)
+            if results.size:
+                min_year = results['start_year'].min()
+                max_year = results['end_year'].max()
                 print(f"  Coverage: {min_year:.0f} to {max_year:.0f} AD ({max_year-min_year:.0f} years)")
 
         print()
@@ -203,14 +216,33 @@ Examples:
       data/ephemerides/jpl/de431/de431_part-1.bsp \\
       data/ephemerides/epm/2021/spice/epm2021.bsp \\
       --compare
+
+  # Also decode native intervals / polynomial degrees (same as inventory_spice.py)
+  python inventory_ephemerides.py data/ephemerides/epm/2021/spice/epm2021.bsp --full
+
+By default only the DAF summary records (target, center, time range) are
+read, which is enough for the ID/coverage listing and fast even on DE441.
         """
     )
     parser.add_argument('files', nargs='+', help='SPICE SPK files to analyze')
     parser.add_argument('--compare', action='store_true', help='Compare multiple files')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-read files instead of using ~/.cache/ephreader/inventory')
+    parser.add_argument('--full', action='store_true',
+                        help='Also read Type 2/3 directories: native intervals, degrees, records')
 
     args = parser.parse_args()
-
-    if args.compare or len(args.files) > 1:
+    inventory_cache.enabled = not args.no_cache
+
+    if args.full:
+        # The per-segment interval/degree scan lives in inventory_spice.py
+        import inventory_spice
+        if args.compare or len(args.files) > 1:
+            inventory_spice.compare_files(args.files)
+        else:
+            results = inventory_spice.analyze_file(args.files[0])
+            inventory_spice.print_statistics(results, Path(args.files[0]).name)
+    elif args.compare or len(args.files) > 1:
         compare_files(args.files)
     else:
         analyze_file(args.files[0])
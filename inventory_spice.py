@@ -7,153 +7,151 @@ Comprehensive analysis of SPICE ephemeris files:
 4. Optimal conversion parameters
 
 Supports: JPL DE, EPM, asteroid files
+(This is the scan behind `inventory_ephemerides.py --full`.)
 """
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List
+from typing import List
 import argparse
 
+import numpy as np
+
 try:
-    from jplephem.spk import SPK
+    from jplephem.spk import S_PER_DAY
 except ImportError:
     print("ERROR: jplephem not installed. Run: pip install jplephem", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent / 'tools'))
+import inventory_cache
+from inventory_cache import cached
+from body_names import BODY_NAMES
+from spk_scan import scan_segments
+
+
+# One record per segment (SoA-friendly structured array).
+# Non-Chebyshev segments: interval_days = NaN, degree = 0, records = -1
+SEGMENT_DTYPE = np.dtype([
+    ('target', 'i8'),
+    ('target_name', 'U35'),
+    ('center', 'i4'),
+    ('interval_days', 'f8'),
+    ('degree', 'i2'),
+    ('records', 'i4'),
+    ('coverage_years', 'f8'),
+    ('start_jd', 'f8'),
+    ('end_jd', 'f8'),
+])
+
+
+# version 2: closed-form degree (Type 2 segments were reported at half degree)
+@cached('inventory_spice', fmt='npy', version=2)
+def scan_file(filepath: str) -> np.ndarray:
+    """Collect interval, degree and coverage of every segment in a SPICE file"""
+
+    results, summaries, directories = scan_segments(filepath, SEGMENT_DTYPE, read_directories=True)
+    data_types = summaries[:, 5].astype(np.int64)
+
+    # Non-Chebyshev defaults
+    results['interval_days'] = np.nan
+    results['degree'] = 0
+    results['records'] = -1
+
+    # Interval and degree from the DAF directory of Chebyshev segments
+    for i in np.flatnonzero((data_types == 2) | (data_types == 3)).tolist():
+        init, interval_sec, rsize, n_records = directories[i]
+        rsize = int(rsize)
+
+        results['interval_days'][i] = interval_sec / S_PER_DAY
+        results['records'][i] = int(n_records)
+
+        # Calculate polynomial degree (closed form)
+        # rsize = (degree+1) * components + 2
+        # components = 3 (Type 2, pos only) or 6 (Type 3, pos+vel)
+        comp = 3 if data_types[i] == 2 else 6
+        r2 = rsize - 2
+        if r2 % comp == 0 and 1 <= r2 // comp - 1 < 50:
+            results['degree'][i] = r2 // comp - 1
 
-BODY_NAMES = {
-    # Planets
-    1: "Mercury", 2: "Venus", 3: "EMB", 4: "Mars",
-    5: "Jupiter", 6: "Saturn", 7: "Uranus", 8: "Neptune", 9: "Pluto",
-    10: "Sun", 301: "Moon", 399: "Earth",
+    return results
 
-    # Barycenters
-    199: "Mercury Barycenter", 299: "Venus Barycenter",
 
-    # Main belt asteroids
-    2000001: "1 Ceres", 2000002: "2 Pallas", 2000003: "3 Juno", 2000004: "4 Vesta",
-    2000010: "10 Hygiea", 2000015: "15 Eunomia", 2000016: "16 Psyche",
+def format_row(r: np.void, start_year: float, end_year: float) -> str:
+    """Format one segment record as a table row"""
 
-    # Centaurs
-    2002060: "2060 Chiron", 2005145: "5145 Pholus",
-}
+    interval_days = r['interval_days']
+    if np.isnan(interval_days):
+        interval_str = "N/A"
+        degree_str = "N/A"
+        records_str = "N/A"
+    else:
+        # Format interval
+        if interval_days >= 1:
+            interval_str = f"{interval_days:.2f} days"
+        else:
+            interval_str = f"{interval_days * 24.0:.1f} hours"
+        degree_str = str(r['degree']) if r['degree'] else "?"
+        records_str = str(r['records'])
 
+    coverage_str = f"{r['coverage_years']:.0f}y ({start_year:.0f}-{end_year:.0f})"
 
-def analyze_file(filepath: str):
-    """Analyze a single SPICE file"""
+    return f"{r['target_name']:<30} {interval_str:<12} {degree_str:<8} {records_str:<10} {coverage_str}"
 
-    print(f"\n{'='*90}")
-    print(f"File: {Path(filepath).name}")
-    print(f"Path: {filepath}")
-    print(f"Size: {Path(filepath).stat().st_size / 1024 / 1024:.1f} MB")
-    print(f"{'='*90}\n")
 
-    kernel = SPK.open(filepath)
+def analyze_file(filepath: str, results: np.ndarray = None):
+    """Analyze a single SPICE file (pass `results` if it was already scanned)"""
 
-    print(f"{'Body':<30} {'Interval':<12} {'Degree':<8} {'Records':<10} {'Coverage (years)'}")
-    print(f"{'-'*30} {'-'*12} {'-'*8} {'-'*10} {'-'*20}")
+    path = Path(filepath)
+    st = path.stat()
 
-    results = []
+    if results is None:
+        results = scan_file(filepath)
 
-    for seg in kernel.segments:
-        target_name = BODY_NAMES.get(seg.target, f"Body {seg.target}")
-        center_name = BODY_NAMES.get(seg.center, f"Center {seg.center}")
+    # Build the whole report and write it with one call instead of one
+    # print() (and write syscall) per segment
+    out = [
+        f"\n{'='*90}",
+        f"File: {path.name}",
+        f"Path: {filepath}",
+        f"Size: {st.st_size / 1024 / 1024:.1f} MB",
+        f"{'='*90}\n",
+        f"{'Body':<30} {'Interval':<12} {'Degree':<8} {'Records':<10} {'Coverage (years)'}",
+        f"{'-'*30} {'-'*12} {'-'*8} {'-'*10} {'-'*20}",
+    ]
 
-        # Initialize variables
-        interval_days = None
-        interval_str = "N/A"
-        degree = None
-        degree_str = "N/A"
-        records = "N/A"
-
-        # Get interval information from DAF array
-        try:
-            # Load segment data
-            array = seg.load_array()
-
-            # SPK Type 2 (Chebyshev) structure:
-            # array[0] = initial epoch (TDB seconds)
-            # array[1] = interval length (seconds)
-            # array[2] = rsize (record size)
-            # array[3] = n_records (number of records)
-
-            if len(array) >= 4:
-                interval_sec = array[1]
-                rsize = int(array[2])
-                n_records = int(array[3])
-
-                interval_days = interval_sec / 86400.0
-                interval_hours = interval_days * 24.0
-
-                # Format interval
-                if interval_days >= 1:
-                    interval_str = f"{interval_days:.2f} days"
-                else:
-                    interval_str = f"{interval_hours:.1f} hours"
-
-                # Calculate polynomial degree
-                # rsize = (degree+1) * components + 2
-                # components = 3 (pos only) or 6 (pos+vel)
-                for comp in [6, 3]:
-                    for d in range(1, 50):
-                        if (d + 1) * comp + 2 == rsize:
-                            degree = d
-                            break
-                    if degree:
-                        break
-
-                degree_str = str(degree) if degree else "?"
-                records = n_records
-
-        except (AttributeError, IndexError, ValueError) as e:
-            pass        # Coverage
-        duration_days = seg.end_jd - seg.start_jd
-        coverage_years = duration_days / 365.25
-
-        # Get time range
-        start_year = 2000 + (seg.start_jd - 2451545.0) / 365.25
-        end_year = 2000 + (seg.end_jd - 2451545.0) / 365.25
-        coverage_str = f"{coverage_years:.0f}y ({start_year:.0f}-{end_year:.0f})"
-
-        print(f"{target_name:<30} {interval_str:<12} {degree_str:<8} {str(records):<10} {coverage_str}")
-
-        results.append({
-            'target': seg.target,
-            'target_name': target_name,
-            'center': seg.center,
-            'interval_days': interval_days,
-            'degree': degree,
-            'records': records if isinstance(records, int) else None,
-            'coverage_years': coverage_years,
-            'start_jd': seg.start_jd,
-            'end_jd': seg.end_jd,
-        })
-
-    kernel.close()
+    # Calendar years for all rows at once
+    start_years = 2000.0 + (results['start_jd'] - 2451545.0) / 365.25
+    end_years = 2000.0 + (results['end_jd'] - 2451545.0) / 365.25
+    out.extend(format_row(r, sy, ey) for r, sy, ey in zip(results, start_years, end_years))
+    out.append("")
 
-    print()
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
     return results
 
 
-def print_statistics(results: List[Dict], filename: str):
+def print_statistics(results: np.ndarray, filename: str):
     """Print interval statistics"""
 
-    intervals = [r['interval_days'] for r in results if r['interval_days'] is not None]
+    all_intervals = results['interval_days']
+    intervals = all_intervals[~np.isnan(all_intervals)]
 
-    if not intervals:
+    if intervals.size == 0:
         return
 
     print(f"\nInterval Statistics for {filename}:")
-    print(f"  Minimum: {min(intervals):.4f} days ({min(intervals)*24:.2f} hours)")
-    print(f"  Maximum: {max(intervals):.4f} days ({max(intervals)*24:.2f} hours)")
-    print(f"  Median:  {sorted(intervals)[len(intervals)//2]:.4f} days")
+    print(f"  Minimum: {intervals.min():.4f} days ({intervals.min()*24:.2f} hours)")
+    print(f"  Maximum: {intervals.max():.4f} days ({intervals.max()*24:.2f} hours)")
+    print(f"  Median:  {np.median(intervals):.4f} days")
 
-    # Unique intervals
-    unique = sorted(set(intervals))
+    # Unique intervals (sorted values with their counts)
+    unique, counts = np.unique(intervals, return_counts=True)
     print(f"  Unique intervals: {len(unique)}")
-    for iv in unique:
-        count = intervals.count(iv)
+    for iv, count in zip(unique.tolist(), counts.tolist()):
         print(f"    {iv:.4f} days ({iv*24:.1f}h): {count} bodies")
 
     print()
@@ -163,43 +161,63 @@ def compare_files(files: List[str]):
     """Compare multiple files"""
 
     all_results = {}
+    index_by_file = {}  # filepath -> {target_id: first segment row}
 
+    paths = {}  # filepath -> Path, built once per file
     for filepath in files:
-        if not Path(filepath).exists():
+        path = Path(filepath)
+        if not path.exists():
             print(f"⚠️  File not found: {filepath}")
             continue
-
-        results = analyze_file(filepath)
-        print_statistics(results, Path(filepath).name)
+        paths[filepath] = path
+    existing = list(paths)
+
+    # Files are independent: scan them in parallel worker processes
+    scanned = {}
+    if existing:
+        max_workers = min(len(existing), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=inventory_cache.set_enabled,
+                                 initargs=(inventory_cache.enabled,)) as ex:
+            futures = {ex.submit(scan_file, fp): fp for fp in existing}
+            for fut in as_completed(futures):
+                scanned[futures[fut]] = fut.result()
+
+    # Reports are printed by the parent, in command-line order
+    for filepath in existing:
+        results = analyze_file(filepath, scanned[filepath])
+        print_statistics(results, paths[filepath].name)
         all_results[filepath] = results
 
+        targets, first_rows = np.unique(results['target'], return_index=True)
+        index_by_file[filepath] = dict(zip(targets.tolist(), first_rows.tolist()))
+
     # Cross-file comparison
     if len(all_results) > 1:
         print(f"\n{'='*90}")
         print("CROSS-FILE COMPARISON: Body Availability")
         print(f"{'='*90}\n")
 
-        # Collect all unique targets
+        # Collect all unique targets (and resolve their names once)
         all_targets = set()
-        for results in all_results.values():
-            for r in results:
-                all_targets.add(r['target'])
+        for by_target in index_by_file.values():
+            all_targets.update(by_target)
+        target_names = {t: BODY_NAMES.get(t, f"Body {t}") for t in all_targets}
 
         # Header
-        file_cols = [Path(f).stem[:15] for f in all_results.keys()]
+        file_cols = [paths[f].stem[:15] for f in all_results.keys()]
         print(f"{'Body':<30} " + " | ".join(f"{col:<15}" for col in file_cols))
         print(f"{'-'*30} " + "-+-".join("-"*15 for _ in file_cols))
 
         for target_id in sorted(all_targets):
-            target_name = BODY_NAMES.get(target_id, f"Body {target_id}")
-            row = [target_name[:30]]
-
-            for filepath, results in all_results.items():
-                target_data = [r for r in results if r['target'] == target_id]
-                if target_data:
-                    r = target_data[0]
-                    if r['interval_days']:
-                        val = f"{r['interval_days']:.2f}d"
+            row = [target_names[target_id][:30]]
+
+            for filepath, by_target in index_by_file.items():
+                row_idx = by_target.get(target_id)
+                if row_idx is not None:
+                    interval_days = all_results[filepath]['interval_days'][row_idx]
+                    if interval_days > 0:
+                        val = f"{interval_days:.2f}d"
                     else:
                         val = "✓"
                 else:
@@ -216,18 +234,18 @@ def compare_files(files: List[str]):
         print(f"{'='*90}\n")
 
         for filepath, results in all_results.items():
-            print(f"\n{Path(filepath).name}:")
+            print(f"\n{paths[filepath].name}:")
 
-            intervals = [r['interval_days'] for r in results if r['interval_days'] is not None]
-            if intervals:
-                max_interval = max(intervals)
+            intervals = results['interval_days'][~np.isnan(results['interval_days'])]
+            if intervals.size:
+                max_interval = intervals.max()
                 print(f"  Max native interval: {max_interval:.2f} days")
                 print(f"  Recommended --interval: {max_interval:.1f} (preserve native resolution)")
                 print(f"  Alternative (smaller): {max_interval/2:.1f} (2x oversampling)")
                 print(f"  Alternative (larger): {max_interval*2:.1f} (2x compression, faster)")
 
             # List bodies
-            bodies = sorted(set(r['target'] for r in results if r['target'] in BODY_NAMES))
+            bodies = [t for t in np.unique(results['target']).tolist() if t in BODY_NAMES]
             body_str = ",".join(map(str, bodies))
             print(f"  Bodies: {body_str}")
             print(f"  Count: {len(bodies)}")
@@ -250,8 +268,11 @@ Examples:
     )
     parser.add_argument('files', nargs='+', help='SPICE SPK files to analyze')
     parser.add_argument('--compare', action='store_true', help='Compare multiple files')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-read files instead of using ~/.cache/ephreader/inventory')
 
     args = parser.parse_args()
+    inventory_cache.enabled = not args.no_cache
 
     if args.compare or len(args.files) > 1:
         compare_files(args.files)
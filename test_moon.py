@@ -1,7 +1,24 @@
 import spiceypy as sp
 import numpy as np
 
-sp.furnsh('data/ephemerides/epm/2021/spice/epm2021.bsp')
+try:
+    from spiceypy import cyice  # SpiceyPy >= 7.0 (vectorized *_v APIs)
+except ImportError:
+    cyice = None
+
+EPM2021_BSP = 'data/ephemerides/epm/2021/spice/epm2021.bsp'
+AU_KM = 149597870.7
+
+
+def load_kernel(path):
+    """furnsh() once per process: skip if the kernel is already in the pool"""
+    try:
+        sp.kinfo(path)
+    except sp.stypes.SpiceyError:
+        sp.furnsh(path)
+
+
+load_kernel(EPM2021_BSP)
 
 # Test Moon at problematic interval
 jd_start = 2451536.5
@@ -21,34 +38,29 @@ jd_samples = jd_mid + jd_half * nodes
 print(f"Testing Moon (ID 301) for interval [{jd_start}, {jd_end}]")
 print(f"Sample points: {len(jd_samples)}")
 
-# Get positions
-positions = []
-for i, jd in enumerate(jd_samples):
-    et = (jd - 2451545.0) * 86400.0
-    try:
-        state, _ = sp.spkgps(301, et, 'J2000', 0)
-        pos_au = [x / 149597870.7 for x in state[:3]]
-        positions.append(pos_au)
-        print(f"  Sample {i}: JD={jd:.2f}, ET={et:.0f}s, pos={pos_au[0]:.6f} AU")
-    except Exception as e:
-        print(f"  Sample {i}: ERROR - {e}")
-        positions.append([0, 0, 0])
-
-positions = np.array(positions)
+# Get positions (all samples in one batch)
+ets = (jd_samples - 2451545.0) * 86400.0
+if cyice is not None:
+    states, _ = cyice.spkgps_v(301, ets, 'J2000', 0)
+    states = np.asarray(states)
+else:
+    states = np.array([sp.spkgps(301, et, 'J2000', 0)[0] for et in ets.tolist()])
+positions = states[:, :3] / AU_KM  # km -> AU
+
+for i, (jd, et) in enumerate(zip(jd_samples, ets)):
+    print(f"  Sample {i}: JD={jd:.2f}, ET={et:.0f}s, pos={positions[i, 0]:.6f} AU")
+
 print(f"\nPositions shape: {positions.shape}")
 print(f"X range: [{positions[:, 0].min():.6f}, {positions[:, 0].max():.6f}] AU")
 
-# Try fitting
+# Try fitting (chebfit accepts 2-D y: one call fits X, Y, Z columns)
 print("\nAttempting Chebyshev fit...")
 try:
-    x_coeffs = np.polynomial.chebyshev.chebfit(nodes, positions[:, 0], degree)
+    coeffs = np.polynomial.chebyshev.chebfit(nodes, positions, degree)
+    x_coeffs, y_coeffs, z_coeffs = coeffs.T
     print(f"✓ X coefficients fitted: {len(x_coeffs)} values")
     print(f"  First 3 coeffs: {x_coeffs[:3]}")
-
-    y_coeffs = np.polynomial.chebyshev.chebfit(nodes, positions[:, 1], degree)
     print(f"✓ Y coefficients fitted: {len(y_coeffs)} values")
-
-    z_coeffs = np.polynomial.chebyshev.chebfit(nodes, positions[:, 2], degree)
     print(f"✓ Z coefficients fitted: {len(z_coeffs)} values")
 
     print("\n✅ Moon fitting works!")
@@ -1,6 +1,18 @@
 import spiceypy as sp
 
-sp.furnsh('data/ephemerides/epm/2021/spice/epm2021.bsp')
+EPM2021_BSP = 'data/ephemerides/epm/2021/spice/epm2021.bsp'
+AU_KM = 149597870.7
+
+
+def load_kernel(path):
+    """furnsh() once per process: skip if the kernel is already in the pool"""
+    try:
+        sp.kinfo(path)
+    except sp.stypes.SpiceyError:
+        sp.furnsh(path)
+
+
+load_kernel(EPM2021_BSP)
 
 # Test Sun (ID 10) at different times
 test_jds = [
@@ -15,7 +27,7 @@ for jd in test_jds:
     et = (jd - 2451545.0) * 86400.0
     try:
         state, _ = sp.spkgps(10, et, 'J2000', 0)
-        print(f"  JD {jd}: ✓ OK (X={state[0]/149597870.7:.3f} AU)")
+        print(f"  JD {jd}: ✓ OK (X={state[0]/AU_KM:.3f} AU)")
     except Exception as e:
         print(f"  JD {jd}: ✗ ERROR - {e}")
 
@@ -1,144 +1,83 @@
 #!/usr/bin/env python3
 """
 Анализ нативных интервалов Чебышёва в SPK файлах через SPICE Toolkit.
-Использует утилиту BRIEF из SPICE для получения детальной информации о сегментах.
+Читает сводки сегментов DAF напрямую через spiceypy (те же вызовы CSPICE,
+что использует утилита BRIEF), без запуска внешнего процесса.
 """
 
-import subprocess
 import sys
 import os
-import re
 from pathlib import Path
 from typing import Dict, List, Tuple
 
-# NAIF ID -> имя тела
-BODY_NAMES = {
-    1: "Mercury", 2: "Venus", 3: "EMB", 4: "Mars", 5: "Jupiter",
-    6: "Saturn", 7: "Uranus", 8: "Neptune", 9: "Pluto", 10: "Sun",
-    199: "Mercury Barycenter", 299: "Venus Barycenter",
-    301: "Moon", 399: "Earth",
-    2000001: "Ceres", 2000002: "Pallas", 2000004: "Vesta",
-    2000007: "Iris", 2000324: "Bamberga",
-    2090377: "Sedna", 2136108: "Haumea", 2136199: "Eris", 2136472: "Makemake",
-    1000000001: "Pluto-Charon Barycenter"
-}
+try:
+    import spiceypy as sp
+except ImportError:
+    print("ERROR: spiceypy not installed. Run: pip install spiceypy", file=sys.stderr)
+    sys.exit(1)
 
+from body_names import BODY_NAMES
 
-def run_spice_brief(spk_file: str, cspice_path: str = "vendor/spice/cspice") -> str:
-    """
-    Запускает SPICE утилиту BRIEF для анализа SPK файла.
-
-    Args:
-        spk_file: Путь к SPK файлу
-        cspice_path: Путь к CSPICE toolkit
 
-    Returns:
-        Вывод команды BRIEF
+def read_spk_segments(spk_file: str) -> Dict[int, Dict]:
     """
-    brief_exe = os.path.join(cspice_path, "exe", "brief.exe")
-
-    if not os.path.exists(brief_exe):
-        raise FileNotFoundError(f"BRIEF executable not found: {brief_exe}")
-
-    if not os.path.exists(spk_file):
-        raise FileNotFoundError(f"SPK file not found: {spk_file}")
+    Читает сводки сегментов SPK напрямую через DAF API CSPICE (spiceypy).
 
-    # Запускаем BRIEF с опцией -t для подробной информации
-    # -c для показа центра координат
-    # -n 1000 для показа всех сегментов
-    cmd = [brief_exe, "-t", "-c", spk_file]
-
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=os.getcwd()
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error running BRIEF: {e}")
-        print(f"STDERR: {e.stderr}")
-        raise
-
-
-def parse_brief_output(output: str) -> Dict[int, Dict]:
-    """
-    Парсит вывод BRIEF для извлечения информации об интервалах.
+    Те же вызовы, что использует BRIEF: dafbfs/daffna/dafgs/dafus, плюс
+    dafgda для 4-словной директории в конце сегментов Type 2/3:
+    [INIT, INTLEN, RSIZE, N].
 
     Returns:
         Dict[body_id, {
             'name': str,
             'segments': List[{
-                'start': float,
-                'end': float,
+                'start': float (ET seconds),
+                'end': float (ET seconds),
                 'interval_length': float (days),
                 'num_intervals': int,
                 'type': str
             }]
         }]
     """
+    if not os.path.exists(spk_file):
+        raise FileNotFoundError(f"SPK file not found: {spk_file}")
+
     bodies = {}
-    current_body = None
-
-    # Регулярные выражения для парсинга
-    body_pattern = re.compile(r"Body:\s+(\d+)\s+(.+)")
-    segment_pattern = re.compile(r"Segment:\s+(\d+)")
-    start_pattern = re.compile(r"Start Time:\s+(.+)")
-    end_pattern = re.compile(r"End Time:\s+(.+)")
-    interval_pattern = re.compile(r"Interval Length:\s+([\d.]+)\s+seconds")
-    count_pattern = re.compile(r"Interval Count:\s+(\d+)")
-    type_pattern = re.compile(r"Type:\s+(\d+)")
-
-    lines = output.split('\n')
-    current_segment = {}
-
-    for line in lines:
-        # Новое тело
-        body_match = body_pattern.search(line)
-        if body_match:
-            body_id = int(body_match.group(1))
-            body_name = body_match.group(2).strip()
-            current_body = body_id
+    handle = sp.dafopr(spk_file)
+
+    try:
+        sp.dafbfs(handle)
+        while sp.daffna():
+            # SPK summary: ND=2 doubles (start, end ET), NI=6 ints
+            # (target, center, frame, type, start address, end address)
+            dc, ic = sp.dafus(sp.dafgs(), 2, 6)
+            body_id, _, _, seg_type, _, end_addr = (int(v) for v in ic[:6])
+
             if body_id not in bodies:
                 bodies[body_id] = {
-                    'name': body_name,
+                    'name': sp.bodc2s(body_id),
                     'segments': []
                 }
-            continue
-
-        # Информация об интервалах (в секундах)
-        interval_match = interval_pattern.search(line)
-        if interval_match and current_body is not None:
-            interval_sec = float(interval_match.group(1))
-            interval_days = interval_sec / 86400.0
-            current_segment['interval_length'] = interval_days
-            continue
-
-        # Количество интервалов
-        count_match = count_pattern.search(line)
-        if count_match and current_body is not None:
-            count = int(count_match.group(1))
-            current_segment['num_intervals'] = count
-            continue
 
-        # Тип сегмента
-        type_match = type_pattern.search(line)
-        if type_match and current_body is not None:
-            seg_type = int(type_match.group(1))
-            current_segment['type'] = f"Type {seg_type}"
-
-            # Если накопили информацию о сегменте, сохраняем
-            if 'interval_length' in current_segment:
-                bodies[current_body]['segments'].append(current_segment.copy())
-                current_segment = {}
-            continue
+            # Интервалы Чебышёва есть только у Type 2/3
+            if seg_type not in (2, 3):
+                continue
+
+            _, interval_sec, _, count = sp.dafgda(handle, end_addr - 3, end_addr)
+            bodies[body_id]['segments'].append({
+                'start': dc[0],
+                'end': dc[1],
+                'interval_length': interval_sec / 86400.0,
+                'num_intervals': int(count),
+                'type': f"Type {seg_type}",
+            })
+    finally:
+        sp.dafcls(handle)
 
     return bodies
 
 
-def analyze_spk_file(spk_file: str, cspice_path: str = "vendor/spice/cspice") -> Dict:
+def analyze_spk_file(spk_file: str) -> Dict:
     """
     Полный анализ SPK файла с извлечением нативных интервалов.
     """
@@ -146,17 +85,12 @@ def analyze_spk_file(spk_file: str, cspice_path: str = "vendor/spice/cspice") ->
     print(f"Analyzing: {spk_file}")
     print(f"{'='*80}\n")
 
-    # Запускаем BRIEF
-    brief_output = run_spice_brief(spk_file, cspice_path)
-
-    # Парсим вывод
-    bodies = parse_brief_output(brief_output)
+    # Читаем сводки сегментов
+    bodies = read_spk_segments(spk_file)
 
     # Выводим результаты
     if not bodies:
-        print("⚠️  No Chebyshev interval data found in BRIEF output.")
-        print("\nRaw BRIEF output:")
-        print(brief_output[:2000])
+        print("⚠️  No segments found in SPK file.")
         return {}
 
     print(f"Found {len(bodies)} bodies with interval data:\n")
@@ -251,15 +185,6 @@ def main():
         print("  python analyze_spk_intervals.py data/ephemerides/*/**.bsp")
         sys.exit(1)
 
-    cspice_path = "vendor/spice/cspice"
-
-    if not os.path.exists(os.path.join(cspice_path, "exe", "brief.exe")):
-        print(f"❌ SPICE Toolkit not found at {cspice_path}")
-        print("\nPlease install SPICE Toolkit:")
-        print("  curl -L -o vendor/spice/cspice.zip https://naif.jpl.nasa.gov/pub/naif/toolkit/C/PC_Windows_VisualC_64bit/packages/cspice.zip")
-        print("  Expand-Archive vendor/spice/cspice.zip -DestinationPath vendor/spice")
-        sys.exit(1)
-
     file_analyses = {}
 
     # Анализируем каждый файл
@@ -269,7 +194,7 @@ def main():
             continue
 
         try:
-            bodies = analyze_spk_file(spk_file, cspice_path)
+            bodies = analyze_spk_file(spk_file)
             file_analyses[spk_file] = bodies
         except Exception as e:
             print(f"❌ Error analyzing {spk_file}: {e}")
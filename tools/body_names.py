@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+NAIF ID -> body name table shared by the inventory and analysis scripts.
+
+The mapping is read-only (MappingProxyType) so no script can patch it
+locally and drift from the others again.
+
+Usage:
+    from body_names import BODY_NAMES, PLANET_IDS
+
+    name = BODY_NAMES.get(target, f"Body {target}")
+"""
+
+from types import MappingProxyType
+from typing import Mapping
+
+_BODY_NAMES = {
+    # Planets
+    1: "Mercury", 2: "Venus", 3: "EMB", 4: "Mars",
+    5: "Jupiter", 6: "Saturn", 7: "Uranus", 8: "Neptune", 9: "Pluto",
+    10: "Sun", 301: "Moon", 399: "Earth",
+
+    # Barycenters
+    199: "Mercury Barycenter", 299: "Venus Barycenter",
+
+    # Main belt asteroids
+    2000001: "1 Ceres", 2000002: "2 Pallas", 2000003: "3 Juno", 2000004: "4 Vesta",
+    2000007: "7 Iris", 2000010: "10 Hygiea", 2000015: "15 Eunomia",
+    2000016: "16 Psyche", 2000324: "324 Bamberga",
+
+    # TNOs/Centaurs/Dwarf planets
+    2002060: "2060 Chiron", 2005145: "5145 Pholus",
+    2090377: "90377 Sedna",
+    2136108: "136108 Haumea",
+    2136199: "136199 Eris",
+    2136472: "136472 Makemake",
+
+    # SSB
+    0: "Solar System Barycenter",
+    1000000001: "Pluto-Charon Barycenter",
+}
+
+BODY_NAMES: Mapping[int, str] = MappingProxyType(_BODY_NAMES)
+
+# Categories used by the inventory summaries
+PLANET_IDS = frozenset((1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 301, 399))
+BARYCENTER_IDS = frozenset((199, 299, 0, 1000000001))
+ASTEROID_RANGE = range(2000000, 3000000)  # Numbered asteroids: 2000000 + number
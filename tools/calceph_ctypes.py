@@ -3,14 +3,22 @@
 Direct calceph C library access using ctypes (no Cython needed).
 
 This bypasses the Cython compilation issues by calling the compiled
-calceph.dll/libcalceph.so directly using Python's ctypes FFI.
+calceph.dll/libcalceph.so directly. If cffi is installed it is used in
+ABI mode (cheaper per call than ctypes/libffi argument marshalling);
+otherwise the ctypes binding is used.
 """
 
+import atexit
 import sys
 import json
 import ctypes
 from pathlib import Path
 
+try:
+    import cffi
+except ImportError:
+    cffi = None
+
 
 # Find calceph library
 calceph_dll = Path("vendor/calceph-4.0.1/build/libcalceph.dll")
@@ -21,32 +29,75 @@ if not calceph_dll.exists():
     sys.exit(1)
 
 # Load calceph library
-try:
-    calceph = ctypes.CDLL(str(calceph_dll))
-except Exception as e:
-    print(json.dumps({"error": f"Failed to load calceph: {e}"}), file=sys.stderr)
-    sys.exit(1)
+if cffi is not None:
+    ffi = cffi.FFI()
+    ffi.cdef("""
+        void *calceph_open(const char *filename);
+        int calceph_compute(void *eph, double JD0, double time,
+                            int target, int center, double PV[6]);
+        void calceph_close(void *eph);
+    """)
+    try:
+        calceph = ffi.dlopen(str(calceph_dll))
+    except OSError as e:
+        print(json.dumps({"error": f"Failed to load calceph: {e}"}), file=sys.stderr)
+        sys.exit(1)
+
+    # Result buffer, allocated once and reused by every call
+    _pv = ffi.new("double[6]")
+else:
+    try:
+        calceph = ctypes.CDLL(str(calceph_dll))
+    except Exception as e:
+        print(json.dumps({"error": f"Failed to load calceph: {e}"}), file=sys.stderr)
+        sys.exit(1)
+
+    # Define C function signatures
+    # t_calcephbin* calceph_open(const char *filename)
+    calceph.calceph_open.argtypes = [ctypes.c_char_p]
+    calceph.calceph_open.restype = ctypes.c_void_p
 
-# Define C function signatures
-# t_calcephbin* calceph_open(const char *filename)
-calceph.calceph_open.argtypes = [ctypes.c_char_p]
-calceph.calceph_open.restype = ctypes.c_void_p
+    # int calceph_compute(t_calcephbin *eph, double JD0, double time,
+    #                     int target, int center, double PV[6])
+    calceph.calceph_compute.argtypes = [
+        ctypes.c_void_p,  # eph
+        ctypes.c_double,  # JD0
+        ctypes.c_double,  # time
+        ctypes.c_int,     # target
+        ctypes.c_int,     # center
+        ctypes.POINTER(ctypes.c_double * 6)  # PV
+    ]
+    calceph.calceph_compute.restype = ctypes.c_int
 
-# int calceph_compute(t_calcephbin *eph, double JD0, double time,
-#                     int target, int center, double PV[6])
-calceph.calceph_compute.argtypes = [
-    ctypes.c_void_p,  # eph
-    ctypes.c_double,  # JD0
-    ctypes.c_double,  # time
-    ctypes.c_int,     # target
-    ctypes.c_int,     # center
-    ctypes.POINTER(ctypes.c_double * 6)  # PV
-]
-calceph.calceph_compute.restype = ctypes.c_int
+    # void calceph_close(t_calcephbin *eph)
+    calceph.calceph_close.argtypes = [ctypes.c_void_p]
+    calceph.calceph_close.restype = None
 
-# void calceph_close(t_calcephbin *eph)
-calceph.calceph_close.argtypes = [ctypes.c_void_p]
-calceph.calceph_close.restype = None
+    # Result buffer, allocated once and reused by every call
+    _pv = (ctypes.c_double * 6)()
+
+
+# Open ephemeris handles, kept for the life of the process: opening parses
+# headers and maps the file, which costs far more than one compute call
+_handles = {}
+
+
+def open_ephemeris(ephemeris_file):
+    """Return a cached calceph handle for the file (None if it cannot be opened)"""
+    eph = _handles.get(ephemeris_file)
+    if eph is None:
+        eph = calceph.calceph_open(ephemeris_file.encode('utf-8'))
+        if not eph:
+            return None
+        _handles[ephemeris_file] = eph
+    return eph
+
+
+@atexit.register
+def close_all():
+    """Close all cached ephemeris handles"""
+    while _handles:
+        calceph.calceph_close(_handles.popitem()[1])
 
 
 def get_position(ephemeris_file, jd, target_id, center_id=0):
@@ -62,33 +113,25 @@ def get_position(ephemeris_file, jd, target_id, center_id=0):
     Returns:
         dict with pos=[x,y,z] and vel=[vx,vy,vz] in AU and AU/day
     """
-    # Open ephemeris
-    eph = calceph.calceph_open(ephemeris_file.encode('utf-8'))
-    if not eph:
+    # Open ephemeris (reused across calls, closed at exit)
+    eph = open_ephemeris(ephemeris_file)
+    if eph is None:
         return {"error": f"Failed to open ephemeris: {ephemeris_file}"}
 
-    try:
-        # Allocate result array
-        pv = (ctypes.c_double * 6)()
-
-        # Compute position (using unit AU + velocity flag)
-        # Units: CALCEPH_UNIT_AU (1) + CALCEPH_UNIT_DAY (2) + CALCEPH_USE_NAIFID (4) = 7
-        result = calceph.calceph_compute(eph, jd, 0.0, target_id, center_id, pv)
-
-        if result == 0:
-            return {"error": f"Failed to compute position for body {target_id}"}
-
-        return {
-            "jd": jd,
-            "target": target_id,
-            "center": center_id,
-            "pos": [pv[0], pv[1], pv[2]],
-            "vel": [pv[3], pv[4], pv[5]]
-        }
-
-    finally:
-        # Close ephemeris
-        calceph.calceph_close(eph)
+    # Compute position (using unit AU + velocity flag)
+    # Units: CALCEPH_UNIT_AU (1) + CALCEPH_UNIT_DAY (2) + CALCEPH_USE_NAIFID (4) = 7
+    result = calceph.calceph_compute(eph, jd, 0.0, target_id, center_id, _pv)
+
+    if result == 0:
+        return {"error": f"Failed to compute position for body {target_id}"}
+
+    return {
+        "jd": jd,
+        "target": target_id,
+        "center": center_id,
+        "pos": [_pv[0], _pv[1], _pv[2]],
+        "vel": [_pv[3], _pv[4], _pv[5]]
+    }
 
 
 def main():
@@ -15,6 +15,8 @@ Date: 2025-10-30
 """
 
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 
@@ -46,6 +48,9 @@ class EphemerisComparison:
         'Earth': 399,
     }
 
+    # Compared bodies as (name, NAIF ID), Earth excluded (it is the observer)
+    BODY_TUPLE = tuple((name, body_id) for name, body_id in BODIES.items() if name != 'Earth')
+
     # Swiss Ephemeris body IDs (different!)
     SE_BODIES = {
         'Sun': 0,
@@ -76,28 +81,24 @@ class EphemerisComparison:
         self.epm2021_file = Path("data/ephemerides/epm/2021/epm2021.eph")
         self.ephe_path = Path("ephe")
 
-        self.de440 = None
-        self.epm2021 = None
-
     def load_ephemerides(self):
-        """Load CALCEPH ephemerides."""
+        """
+        Check the CALCEPH ephemeris files (they are opened by the worker
+        processes of compare_calceph_sources, not here).
+        """
         if not HAS_CALCEPH:
             return False
 
         print("Loading ephemerides...")
 
-        # Load JPL DE440
+        # JPL DE440
         if self.de440_file.exists():
-            self.de440 = calceph.CalcephBin()
-            self.de440.open(str(self.de440_file))
             print(f"  ✓ JPL DE440: {self.de440_file}")
         else:
             print(f"  ⚠ JPL DE440 not found: {self.de440_file}")
 
-        # Load EPM2021
+        # EPM2021
         if self.epm2021_file.exists():
-            self.epm2021 = calceph.CalcephBin()
-            self.epm2021.open(str(self.epm2021_file))
             print(f"  ✓ EPM2021: {self.epm2021_file}")
         else:
             print(f"  ⚠ EPM2021 not found: {self.epm2021_file}")
@@ -105,59 +106,65 @@ class EphemerisComparison:
         print()
         return True
 
-    def compute_geocentric_ecliptic(self, eph, body_id, jd):
+    @staticmethod
+    def heliocentric_positions(eph, body_ids, jd, out):
         """
-        Compute geocentric ecliptic longitude/latitude.
+        Fill out[i] with the heliocentric position of body_ids[i] at jd.
+
+        Rows of bodies that could not be computed are left untouched
+        (NaN when out was created with np.full(..., np.nan)).
 
         Returns:
-            tuple: (longitude_deg, latitude_deg, distance_au) or None
+            Earth's heliocentric position (x, y, z) or None
         """
-        if eph is None:
-            return None
+        unit = calceph.Constants.UNIT_AU + calceph.Constants.USECSUN
 
         try:
-            # Get heliocentric position of body
-            pos_body = eph.compute(jd, 0.0, body_id, 0,
-                                   calceph.Constants.UNIT_AU + calceph.Constants.USECSUN)
-
-            # Get heliocentric position of Earth
-            pos_earth = eph.compute(jd, 0.0, 399, 0,
-                                    calceph.Constants.UNIT_AU + calceph.Constants.USECSUN)
-
-            if pos_body is None or pos_earth is None:
-                return None
+            pos_earth = eph.compute(jd, 0.0, 399, 0, unit)
+        except Exception as e:
+            print(f"    Error computing 399: {e}")
+            return None
 
-            # Geocentric position
-            dx = pos_body[0] - pos_earth[0]
-            dy = pos_body[1] - pos_earth[1]
-            dz = pos_body[2] - pos_earth[2]
+        if pos_earth is None:
+            return None
 
-            # Convert to ecliptic longitude/latitude
-            # Ecliptic longitude: arctan2(y, x)
-            lon_rad = np.arctan2(dy, dx)
-            lon_deg = np.degrees(lon_rad) % 360.0
+        for i, body_id in enumerate(body_ids):
+            try:
+                pos_body = eph.compute(jd, 0.0, body_id, 0, unit)
+            except Exception as e:
+                print(f"    Error computing {body_id}: {e}")
+                continue
+            if pos_body is not None:
+                out[i] = pos_body[:3]
 
-            # Distance
-            r = np.sqrt(dx*dx + dy*dy + dz*dz)
+        return pos_earth[:3]
 
-            # Ecliptic latitude: arcsin(z/r)
-            lat_rad = np.arcsin(dz / r)
-            lat_deg = np.degrees(lat_rad)
+    @staticmethod
+    def ecliptic_coordinates(d):
+        """
+        Ecliptic longitude/latitude and distance of geocentric vectors.
 
-            return (lon_deg, lat_deg, r)
+        Args:
+            d: ndarray (..., 3) of geocentric positions (AU)
 
-        except Exception as e:
-            print(f"    Error computing {body_id}: {e}")
-            return None
+        Returns:
+            tuple of arrays: (longitude_deg, latitude_deg, distance_au)
+        """
+        x, y, z = d[..., 0], d[..., 1], d[..., 2]
+        lon_deg = np.degrees(np.arctan2(y, x)) % 360.0
+        r = np.sqrt(x*x + y*y + z*z)
+        lat_deg = np.degrees(np.arcsin(z / r))
+        return (lon_deg, lat_deg, r)
 
     def angular_separation(self, lon1, lat1, lon2, lat2):
         """
         Calculate angular separation between two points on sphere.
 
-        Uses haversine formula for accuracy.
+        Uses haversine formula for accuracy. Accepts scalars or arrays of
+        any (broadcastable) shape.
 
         Returns:
-            float: Angular separation in arcseconds
+            float or ndarray: Angular separation in arcseconds
         """
         # Convert to radians
         lon1_rad = np.radians(lon1)
@@ -177,7 +184,7 @@ class EphemerisComparison:
 
     def compare_calceph_sources(self):
         """Compare EPM2021 vs JPL DE440."""
-        if not HAS_CALCEPH or self.de440 is None or self.epm2021 is None:
+        if not HAS_CALCEPH or not self.de440_file.exists() or not self.epm2021_file.exists():
             return
 
         print("=" * 80)
@@ -187,39 +194,42 @@ class EphemerisComparison:
         print("Metric: Geocentric ecliptic angular separation (arcseconds)")
         print()
 
-        # Results storage
-        results = {body: [] for body in self.BODIES.keys() if body not in ['Earth']}
-
-        for epoch_name, jd in self.TEST_EPOCHS:
+        bodies = self.BODY_TUPLE
+        body_ids = [body_id for _, body_id in bodies]
+
+        # Heliocentric positions from both sources, SoA layout:
+        # bodies (N_epochs, N_bodies, 3), Earth (N_epochs, 3); NaN = no data.
+        # One job per source, looping epoch -> body inside it: each worker
+        # stays on a single ephemeris file, whose Chebyshev records stay hot
+        # in the page/CPU cache, and the two sources run concurrently
+        jds = [jd for _, jd in self.TEST_EPOCHS]
+        with ProcessPoolExecutor(max_workers=min(2, os.cpu_count() or 1)) as ex:
+            fut_de = ex.submit(_heliocentric_job, str(self.de440_file), body_ids, jds)
+            fut_epm = ex.submit(_heliocentric_job, str(self.epm2021_file), body_ids, jds)
+            earth_de, pos_de = fut_de.result()
+            earth_epm, pos_epm = fut_epm.result()
+
+        # Geocentric ecliptic coordinates, (N_epochs, N_bodies)
+        lon_de, lat_de, _ = self.ecliptic_coordinates(pos_de - earth_de[:, None, :])
+        lon_epm, lat_epm, _ = self.ecliptic_coordinates(pos_epm - earth_epm[:, None, :])
+
+        # Angular separation for the whole epoch x body matrix in one call
+        seps = self.angular_separation(lon_de, lat_de, lon_epm, lat_epm)
+
+        # Longitude difference (for debugging)
+        dlon = np.abs(lon_epm - lon_de)
+        dlon_arcsec = np.where(dlon > 180, 360 - dlon, dlon) * 3600
+
+        for e, (epoch_name, jd) in enumerate(self.TEST_EPOCHS):
             print(f"Epoch: {epoch_name} (JD {jd})")
             print("-" * 80)
 
-            for body_name, body_id in self.BODIES.items():
-                if body_name == 'Earth':
-                    continue
-
-                # Compute from both sources
-                de440_pos = self.compute_geocentric_ecliptic(self.de440, body_id, jd)
-                epm_pos = self.compute_geocentric_ecliptic(self.epm2021, body_id, jd)
-
-                if de440_pos is None or epm_pos is None:
+            for i, (body_name, body_id) in enumerate(bodies):
+                sep_arcsec = seps[e, i]
+                if np.isnan(sep_arcsec):
                     print(f"  {body_name:10s}: Data unavailable")
                     continue
 
-                lon_de, lat_de, r_de = de440_pos
-                lon_epm, lat_epm, r_epm = epm_pos
-
-                # Angular separation
-                sep_arcsec = self.angular_separation(lon_de, lat_de, lon_epm, lat_epm)
-
-                # Longitude difference (for debugging)
-                dlon = abs(lon_epm - lon_de)
-                if dlon > 180:
-                    dlon = 360 - dlon
-                dlon_arcsec = dlon * 3600
-
-                results[body_name].append(sep_arcsec)
-
                 # Format output
                 if sep_arcsec < 1.0:
                     status = "✅"
@@ -229,7 +239,7 @@ class EphemerisComparison:
                     status = "❌"
 
                 print(f"  {body_name:10s}: {sep_arcsec:8.3f}\" {status}  " +
-                      f"(lon: {lon_epm:7.3f}° vs {lon_de:7.3f}°, Δ={dlon_arcsec:.1f}\")")
+                      f"(lon: {lon_epm[e, i]:7.3f}° vs {lon_de[e, i]:7.3f}°, Δ={dlon_arcsec[e, i]:.1f}\")")
 
             print()
 
@@ -241,15 +251,22 @@ class EphemerisComparison:
         print(f"{'Body':<12} {'Samples':>8} {'Mean':>10} {'Median':>10} {'Max':>10} {'Status'}")
         print("-" * 80)
 
-        for body_name in ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars',
-                          'Jupiter', 'Saturn', 'Uranus', 'Neptune', 'Pluto']:
-            if body_name not in results or len(results[body_name]) == 0:
+        # Per-body statistics as column reductions over the (epoch, body)
+        # matrix, skipping bodies without any sample
+        samples = np.count_nonzero(~np.isnan(seps), axis=0)
+        valid = samples > 0
+        mean_errs = np.full(len(bodies), np.nan)
+        median_errs = np.full(len(bodies), np.nan)
+        max_errs = np.full(len(bodies), np.nan)
+        mean_errs[valid] = np.nanmean(seps[:, valid], axis=0)
+        median_errs[valid] = np.nanmedian(seps[:, valid], axis=0)
+        max_errs[valid] = np.nanmax(seps[:, valid], axis=0)
+
+        for i, (body_name, body_id) in enumerate(bodies):
+            if not valid[i]:
                 continue
 
-            errors = np.array(results[body_name])
-            mean_err = np.mean(errors)
-            median_err = np.median(errors)
-            max_err = np.max(errors)
+            mean_err, median_err, max_err = mean_errs[i], median_errs[i], max_errs[i]
 
             # Status
             if median_err < 1.0:
@@ -261,7 +278,7 @@ class EphemerisComparison:
             else:
                 status = "❌ Poor"
 
-            print(f"{body_name:<12} {len(errors):>8} " +
+            print(f"{body_name:<12} {samples[i]:>8} " +
                   f"{mean_err:>9.2f}\" {median_err:>9.2f}\" {max_err:>9.2f}\" {status}")
 
         print()
@@ -290,11 +307,30 @@ class EphemerisComparison:
 
         self.compare_with_swisseph()
 
-        # Cleanup
-        if self.de440:
-            self.de440.close()
-        if self.epm2021:
-            self.epm2021.close()
+
+def _heliocentric_job(eph_path, body_ids, jds):
+    """
+    Worker: heliocentric positions of body_ids and Earth at every epoch.
+
+    calceph handles cannot be pickled, so the worker opens the ephemeris
+    itself and closes it when the job is done.
+
+    Returns:
+        tuple: (earth (N_epochs, 3), positions (N_epochs, N_bodies, 3)),
+        NaN = no data
+    """
+    eph = calceph.CalcephBin()
+    eph.open(eph_path)
+    try:
+        earth = np.full((len(jds), 3), np.nan)
+        out = np.full((len(jds), len(body_ids), 3), np.nan)
+        for e, jd in enumerate(jds):
+            pos_earth = EphemerisComparison.heliocentric_positions(eph, body_ids, jd, out[e])
+            if pos_earth is not None:
+                earth[e] = pos_earth
+        return earth, out
+    finally:
+        eph.close()
 
 
 def main():
@@ -13,11 +13,22 @@ Date: 2025-10-30
 """
 
 import json
-import struct
 import sys
 from pathlib import Path
 import numpy as np
 
+try:
+    import orjson  # Faster JSON parsing for large Horizons files
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
 # Try to import Swiss Ephemeris (optional)
 try:
     import swisseph as swe
@@ -28,6 +39,109 @@ except ImportError:
     print("  Install with: pip install pyswisseph")
     print()
 
+def error_stats_numpy(errors):
+    """(mean, max, rms) of an error array (NumPy)"""
+    return errors.mean(), errors.max(), np.sqrt(np.mean(errors * errors))
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def error_stats(errors):
+        """Single-pass version of error_stats_numpy"""
+        s = 0.0
+        s2 = 0.0
+        mx = -np.inf
+        for v in errors:
+            s += v
+            s2 += v * v
+            if v > mx:
+                mx = v
+        n = len(errors)
+        return s / n, mx, np.sqrt(s2 / n)
+else:
+    error_stats = error_stats_numpy
+
+
+def median_partition(errors):
+    """Median via O(n) selection (np.partition) instead of a full sort"""
+    n = len(errors)
+    half = n // 2
+    if n % 2:
+        return np.partition(errors, half)[half]
+    part = np.partition(errors, (half - 1, half))
+    return 0.5 * (part[half - 1] + part[half])
+
+
+# .eph binary layout (little-endian, packed)
+EPH_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('num_bodies', '<u4'),
+    ('num_intervals', '<u4'),
+    ('interval_days', '<f8'),
+    ('start_jd', '<f8'),
+    ('end_jd', '<f8'),
+    ('coeff_degree', '<u4'),
+])
+EPH_INTERVAL_DTYPE = np.dtype([('jd_start', '<f8'), ('jd_end', '<f8')])
+EPH_HEADER_SIZE = 512
+BODY_ENTRY_SIZE = 36  # <i24sQ: id, name, data offset - same as the converter / EphReader
+
+
+def clenshaw_xyz(coeffs, x):
+    """
+    Evaluate X, Y, Z Chebyshev series at once (coeffs shape (3, n)).
+
+    One recurrence whose state is 3-vectors: each step updates all three
+    components, instead of three separate Clenshaw loops.
+    """
+    n = coeffs.shape[1]
+    b_k_plus_2 = np.zeros(3)
+    b_k_plus_1 = np.zeros(3)
+
+    for k in range(n - 1, 0, -1):
+        b_k = 2.0 * x * b_k_plus_1 - b_k_plus_2 + coeffs[:, k]
+        b_k_plus_2 = b_k_plus_1
+        b_k_plus_1 = b_k
+
+    return x * b_k_plus_1 - b_k_plus_2 + coeffs[:, 0]
+
+
+if njit is not None:
+    # Same loop compiled to machine code (float64 coeffs, scalar x)
+    clenshaw_xyz = njit(cache=True, fastmath=True)(clenshaw_xyz)
+
+
+def eph_position_kernel(jd, start_jd, dt, coeffs):
+    """
+    Interval lookup + X/Y/Z Clenshaw on a uniform interval grid.
+
+    coeffs has shape (num_intervals, 3, degree+1); jd must be in range.
+    """
+    ii = int((jd - start_jd) / dt)
+    if ii >= coeffs.shape[0]:
+        ii = coeffs.shape[0] - 1  # jd == end of the last interval
+    t = 2.0 * (jd - start_jd - ii * dt) / dt - 1.0
+    return clenshaw_xyz(coeffs[ii], t)
+
+
+if njit is not None:
+    # nogil: threads can evaluate epochs concurrently
+    eph_position_kernel = njit(nogil=True, cache=True)(eph_position_kernel)
+
+
+def eph_positions_kernel(jds, start_jd, dt, coeffs):
+    """eph_position_kernel() for an array of epochs -> (N, 3)"""
+    out = np.empty((len(jds), 3))
+    for i in prange(len(jds)):
+        out[i] = eph_position_kernel(jds[i], start_jd, dt, coeffs)
+    return out
+
+
+if njit is not None:
+    # One call for all epochs, spread over cores with prange
+    eph_positions_kernel = njit(parallel=True, cache=True)(eph_positions_kernel)
+
 
 class ChironComparison:
     """Compare Chiron data from multiple sources."""
@@ -38,111 +152,157 @@ class ChironComparison:
         self.json_file = Path("data/chiron/chiron_vectors_jpl.json")
         self.eph_file = Path("data/chiron/chiron_jpl.eph")
         self.ephe_path = Path("ephe")  # Swiss Ephemeris data files
+        self._swe_inited = False
 
         self.json_data = None
-        self.eph_file_handle = None
+        self._epochs_arr = None
+        self._vectors = None
+        self.eph_map = None
         self.eph_header = None
-        self.eph_intervals = []
+        self.eph_intervals = None
+        self.eph_jd_starts = None
+        self.eph_jd_ends = None
+        self.eph_uniform = False
+        self.eph_coeffs = None
 
     def load_json(self):
         """Load original JPL Horizons JSON data."""
         print("Loading JPL Horizons JSON data...")
-        with open(self.json_file, 'r') as f:
-            self.json_data = json.load(f)
-        print(f"  ✓ Loaded {len(self.json_data['epochs'])} points\n")
+        with open(self.json_file, 'rb') as f:
+            self.json_data = _loads(f.read())
+
+        # Lookup tables built once: sorted epochs and (N, 3) positions.
+        # The vector dicts are dropped afterwards: only the array is used.
+        self._epochs_arr = np.asarray(self.json_data['epochs'], dtype=np.float64)
+        vectors = self.json_data.pop('vectors')
+        self._vectors = np.fromiter((c for v in vectors for c in (v['x'], v['y'], v['z'])),
+                                    dtype=np.float64, count=3 * len(vectors)).reshape(-1, 3)
+        print(f"  ✓ Loaded {len(self._epochs_arr)} points\n")
 
     def load_eph_file(self):
-        """Load binary .eph file."""
+        """Load binary .eph file (memory-mapped, tables are zero-copy views)."""
         print("Loading binary .eph file...")
-        self.eph_file_handle = open(self.eph_file, 'rb')
+        self.eph_map = np.memmap(self.eph_file, dtype=np.uint8, mode='r')
 
         # Read header
-        header_data = self.eph_file_handle.read(512)
-        unpacked = struct.unpack('<4sIIIdddI', header_data[:44])
-
-        self.eph_header = {
-            'magic': unpacked[0],
-            'version': unpacked[1],
-            'num_bodies': unpacked[2],
-            'num_intervals': unpacked[3],
-            'interval_days': unpacked[4],
-            'start_jd': unpacked[5],
-            'end_jd': unpacked[6],
-            'coeff_degree': unpacked[7]
-        }
-
-        # Skip body table (40 bytes)
-        self.eph_file_handle.seek(512 + 40)
-
-        # Read intervals
-        for i in range(self.eph_header['num_intervals']):
-            interval_data = self.eph_file_handle.read(16)
-            jd_start, jd_end = struct.unpack('<dd', interval_data)
-            self.eph_intervals.append({'jd_start': jd_start, 'jd_end': jd_end})
+        header = np.frombuffer(self.eph_map[:EPH_HEADER_DTYPE.itemsize], dtype=EPH_HEADER_DTYPE)[0]
+        self.eph_header = {name: header[name].item() for name in EPH_HEADER_DTYPE.names}
+
+        num_intervals = self.eph_header['num_intervals']
+        degree = self.eph_header['coeff_degree']
+
+        # Intervals follow the header and the body table
+        index_offset = EPH_HEADER_SIZE + self.eph_header['num_bodies'] * BODY_ENTRY_SIZE
+        data_offset = index_offset + num_intervals * EPH_INTERVAL_DTYPE.itemsize
+        self.eph_intervals = np.frombuffer(self.eph_map[index_offset:data_offset],
+                                           dtype=EPH_INTERVAL_DTYPE)
+        self.eph_jd_starts = np.ascontiguousarray(self.eph_intervals['jd_start'])
+        self.eph_jd_ends = np.ascontiguousarray(self.eph_intervals['jd_end'])
+
+        # Uniform grid: intervals can be located arithmetically (in the kernel).
+        # Each interval must also span exactly interval_days, since the kernel
+        # normalizes time by that width and does not check jd_end
+        interval_days = self.eph_header['interval_days']
+        expected_starts = self.eph_header['start_jd'] + np.arange(num_intervals) * interval_days
+        self.eph_uniform = bool(
+            np.allclose(self.eph_jd_starts, expected_starts, rtol=0.0, atol=1e-9)
+            and np.allclose(self.eph_jd_ends - self.eph_jd_starts, interval_days, rtol=0.0, atol=1e-9))
+
+        # Coefficients: (interval, X/Y/Z, degree+1)
+        data_size = num_intervals * 3 * (degree + 1) * 8
+        self.eph_coeffs = np.frombuffer(self.eph_map[data_offset:data_offset + data_size],
+                                        dtype='<f8').reshape(num_intervals, 3, degree + 1)
 
         print(f"  ✓ Loaded {len(self.eph_intervals)} intervals\n")
 
     def get_json_position(self, jd):
         """Get position from JSON data (nearest epoch)."""
-        epochs = np.array(self.json_data['epochs'])
-        idx = np.argmin(np.abs(epochs - jd))
+        epochs = self._epochs_arr
+
+        # Epochs are sorted: binary search, then pick the nearer neighbour
+        i = int(np.searchsorted(epochs, jd))
+        if i == 0:
+            idx = 0
+        elif i == len(epochs):
+            idx = i - 1
+        else:
+            idx = i if abs(epochs[i] - jd) < abs(epochs[i - 1] - jd) else i - 1
 
         if abs(epochs[idx] - jd) > 8.0:  # More than 8 days away
             return None
 
-        vector = self.json_data['vectors'][idx]
-        return np.array([vector['x'], vector['y'], vector['z']])
+        return self._vectors[idx]
+
+    def find_interval(self, jd):
+        """Index of the interval containing jd, or None if out of range."""
+        n = len(self.eph_jd_starts)
+        if n == 0 or not (self.eph_jd_starts[0] <= jd <= self.eph_jd_ends[-1]):
+            return None
+
+        # Uniform grid: direct arithmetic index
+        idx = int((jd - self.eph_header['start_jd']) // self.eph_header['interval_days'])
+        idx = min(max(idx, 0), n - 1)
+        if self.eph_jd_starts[idx] <= jd <= self.eph_jd_ends[idx]:
+            return idx
+
+        # Non-uniform intervals: binary search on the sorted starts
+        idx = int(np.searchsorted(self.eph_jd_starts, jd, side='right')) - 1
+        if idx >= 0 and jd <= self.eph_jd_ends[idx]:
+            return idx
+        return None
 
     def get_eph_position(self, jd):
         """Get position from .eph file (Chebyshev interpolation)."""
-        # Find interval
-        interval_idx = None
-        for idx, interval in enumerate(self.eph_intervals):
-            if interval['jd_start'] <= jd <= interval['jd_end']:
-                interval_idx = idx
-                break
-
+        interval_idx = self.find_interval(jd)
         if interval_idx is None:
             return None
 
-        interval = self.eph_intervals[interval_idx]
+        jd_start = self.eph_jd_starts[interval_idx]
+        jd_end = self.eph_jd_ends[interval_idx]
 
         # Normalize time
-        t_norm = 2.0 * (jd - interval['jd_start']) / (interval['jd_end'] - interval['jd_start']) - 1.0
-
-        # Read coefficients
-        degree = self.eph_header['coeff_degree']
-        coeffs_per_interval = 3 * (degree + 1)
-        bytes_per_interval = coeffs_per_interval * 8
-
-        # Data starts after header (512) + body table (40) + interval index (72*16)
-        data_offset = 512 + 40 + self.eph_header['num_intervals'] * 16
-        offset = data_offset + interval_idx * bytes_per_interval
-
-        self.eph_file_handle.seek(offset)
-        coeff_data = self.eph_file_handle.read(bytes_per_interval)
-        coeffs = struct.unpack(f'<{coeffs_per_interval}d', coeff_data)
-
-        # Split into X, Y, Z
-        n = degree + 1
-        x_coeffs = coeffs[0:n]
-        y_coeffs = coeffs[n:2*n]
-        z_coeffs = coeffs[2*n:3*n]
-
-        # Evaluate Chebyshev polynomials
-        x = self.eval_chebyshev(x_coeffs, t_norm)
-        y = self.eval_chebyshev(y_coeffs, t_norm)
-        z = self.eval_chebyshev(z_coeffs, t_norm)
-
-        return np.array([x, y, z])
+        t_norm = 2.0 * (jd - jd_start) / (jd_end - jd_start) - 1.0
+
+        # Coefficients of this interval: a view into the mapped file
+        coeffs = self.eph_coeffs[interval_idx]
+
+        # Evaluate the three Chebyshev polynomials in one recurrence
+        return clenshaw_xyz(coeffs, t_norm)
+
+    def get_eph_positions(self, jds):
+        """
+        Positions from .eph file for many epochs at once.
+
+        Returns:
+            ndarray (N, 3); rows of epochs outside the file's range are NaN
+        """
+        jds = np.asarray(jds, dtype=np.float64)
+
+        if not self.eph_uniform:
+            out = np.full((len(jds), 3), np.nan)
+            for i, jd in enumerate(jds):
+                pos = self.get_eph_position(jd)
+                if pos is not None:
+                    out[i] = pos
+            return out
+
+        # Uniform grid: one compiled call evaluates every in-range epoch
+        in_range = (jds >= self.eph_jd_starts[0]) & (jds <= self.eph_jd_ends[-1])
+        out = np.full((len(jds), 3), np.nan)
+        out[in_range] = eph_positions_kernel(jds[in_range], self.eph_header['start_jd'],
+                                             self.eph_header['interval_days'], self.eph_coeffs)
+        return out
 
     def get_swisseph_position(self, jd):
         """Get position from Swiss Ephemeris."""
         if not HAS_SWISSEPH:
             return None
 
-        # Set ephemeris path
-        swe.set_ephe_path(str(self.ephe_path.absolute()))
+        # Set ephemeris path (once: Swiss Eph keeps it, and resetting it
+        # may reopen the .se1 files)
+        if not self._swe_inited:
+            swe.set_ephe_path(str(self.ephe_path.absolute()))
+            self._swe_inited = True
 
         # SE_CHIRON = 15
         # SEFLG_SWIEPH = 2 (use .se1 files)
@@ -159,25 +319,6 @@ class ChironComparison:
             print(f"  Swiss Eph error at JD {jd}: {e}")
             return None
 
-    @staticmethod
-    def eval_chebyshev(coeffs, x):
-        """Evaluate Chebyshev polynomial using Clenshaw's algorithm."""
-        n = len(coeffs)
-        if n == 0:
-            return 0.0
-        if n == 1:
-            return coeffs[0]
-
-        b_k_plus_2 = 0.0
-        b_k_plus_1 = 0.0
-
-        for k in range(n - 1, 0, -1):
-            b_k = 2.0 * x * b_k_plus_1 - b_k_plus_2 + coeffs[k]
-            b_k_plus_2 = b_k_plus_1
-            b_k_plus_1 = b_k
-
-        return x * b_k_plus_1 - b_k_plus_2 + coeffs[0]
-
     def compare_sources(self, test_epochs):
         """Compare positions from all sources."""
         print("=" * 70)
@@ -193,13 +334,18 @@ class ChironComparison:
 
         results = []
 
-        for epoch_name, jd in test_epochs:
+        # .eph positions for all epochs up front
+        eph_positions = self.get_eph_positions([jd for _, jd in test_epochs])
+
+        for (epoch_name, jd), eph_pos in zip(test_epochs, eph_positions):
+            if np.isnan(eph_pos[0]):
+                eph_pos = None
+
             print(f"Epoch: {epoch_name} (JD {jd})")
             print("-" * 70)
 
             # Get positions from all sources
             json_pos = self.get_json_position(jd)
-            eph_pos = self.get_eph_position(jd)
             swe_pos = self.get_swisseph_position(jd) if HAS_SWISSEPH else None
 
             if json_pos is None:
@@ -249,19 +395,23 @@ class ChironComparison:
             swe_errors = [r['swe_error_km'] for r in results if r['swe_error_km'] is not None]
 
             if eph_errors:
+                errors = np.asarray(eph_errors, dtype=np.float64)
+                mean_err, max_err, rms_err = error_stats(errors)
                 print("Binary .eph file accuracy:")
-                print(f"  RMS error:    {np.sqrt(np.mean(np.array(eph_errors)**2)):.3f} km")
-                print(f"  Mean error:   {np.mean(eph_errors):.3f} km")
-                print(f"  Median error: {np.median(eph_errors):.3f} km")
-                print(f"  Max error:    {np.max(eph_errors):.3f} km")
+                print(f"  RMS error:    {rms_err:.3f} km")
+                print(f"  Mean error:   {mean_err:.3f} km")
+                print(f"  Median error: {median_partition(errors):.3f} km")
+                print(f"  Max error:    {max_err:.3f} km")
                 print()
 
             if swe_errors:
+                errors = np.asarray(swe_errors, dtype=np.float64)
+                mean_err, max_err, rms_err = error_stats(errors)
                 print("Swiss Ephemeris accuracy (vs JPL Horizons):")
-                print(f"  RMS error:    {np.sqrt(np.mean(np.array(swe_errors)**2)):.0f} km")
-                print(f"  Mean error:   {np.mean(swe_errors):.0f} km")
-                print(f"  Median error: {np.median(swe_errors):.0f} km")
-                print(f"  Max error:    {np.max(swe_errors):.0f} km")
+                print(f"  RMS error:    {rms_err:.0f} km")
+                print(f"  Mean error:   {mean_err:.0f} km")
+                print(f"  Median error: {median_partition(errors):.0f} km")
+                print(f"  Max error:    {max_err:.0f} km")
                 print()
 
     def run(self):
@@ -270,7 +420,7 @@ class ChironComparison:
         self.load_eph_file()
 
         # Use EXACT epochs from JSON data (subset for testing)
-        epochs_array = np.array(self.json_data['epochs'])
+        epochs_array = self._epochs_arr
 
         # Select test epochs: every 300th point (about 7 samples)
         indices = np.arange(0, len(epochs_array), 300)
@@ -282,9 +432,10 @@ class ChironComparison:
             year = 2000 + (jd - 2451545.0) / 365.25
             test_epochs.append((f"Index {idx} (~{year:.0f})", jd))
 
-        self.compare_sources(test_epochs)        # Cleanup
-        if self.eph_file_handle:
-            self.eph_file_handle.close()
+        self.compare_sources(test_epochs)
+
+        # Cleanup (drop the views so the mapping is released)
+        self.eph_intervals = self.eph_coeffs = self.eph_map = None
 
 
 def main():
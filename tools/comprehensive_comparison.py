@@ -4,13 +4,30 @@
 Сравнивает JPL DE440, DE431, EPM2021, Swiss Ephemeris
 """
 
+import math
+import os
+import struct
 import sys
+import threading
 import time
-import statistics
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence
 import json
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    from jplephem.daf import DAF
+    from jplephem.spk import S_PER_DAY
+except ImportError:
+    DAF = None
+
 # Добавляем путь к calceph
 sys.path.insert(0, str(Path(__file__).parent.parent / 'vendor' / 'calceph-4.0.1' / 'install' / 'lib' / 'python'))
 
@@ -44,17 +61,73 @@ TEST_BODIES = {
     301: "Moon",
     399: "Earth",
 }
+BODY_KEYS = tuple(TEST_BODIES)  # NAIF ID в порядке TEST_BODIES
+
+AU_TO_KM = 149597870.7
+
+# Нативный бинарный формат JPL (DE4xx, не DAF): после заголовков (3×84 байт)
+# и имён констант (400×6 байт) идут SS[3] (начало, конец, длина записи в
+# днях), NCON, AU, EMRAT и таблица IPT[12][3] (смещение, число
+# коэффициентов, число подынтервалов на запись)
+JPL_NATIVE_HEADER = {endian: struct.Struct(endian + '3di2d36ii') for endian in '<>'}
+JPL_NATIVE_HEADER_OFFSET = 3 * 84 + 400 * 6
+# NAIF ID -> строка IPT (Луна хранится геоцентрической, Земля — не хранится)
+JPL_NATIVE_IPT_ROW = {1: 0, 2: 1, 3: 2, 4: 3, 5: 4, 6: 5, 7: 6, 8: 7, 9: 8, 301: 9, 10: 10}
+
+
+def read_jpl_native_intervals(header: bytes) -> Dict[int, float]:
+    """Длина нативного интервала (дни) по телам из первой записи файла JPL DE4xx"""
+    # Порядок байт не записан в файле: выбираем тот, при котором длина
+    # записи (SS[2]) и номер DE выглядят правдоподобно
+    for layout in JPL_NATIVE_HEADER.values():
+        fields = layout.unpack_from(header, JPL_NATIVE_HEADER_OFFSET)
+        record_days = fields[2]
+        numde = fields[42]
+        if 0.0 < record_days <= 1000.0 and 0 < numde < 10000:
+            break
+    else:
+        raise ValueError('не похоже на нативный бинарный файл JPL')
+
+    ipt = fields[6:42]
+    return {body_id: record_days / ipt[3 * row + 2]
+            for body_id, row in JPL_NATIVE_IPT_ROW.items()
+            if ipt[3 * row + 2] > 0}
+
+
+def distance_3d_many_numpy(pos1: np.ndarray, pos2: np.ndarray) -> np.ndarray:
+    """Евклидовы расстояния между строками двух массивов (N, 3), AU"""
+    return np.linalg.norm(pos1 - pos2, axis=1)
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def distance_3d_many(pos1, pos2):
+        """Однопроходная версия distance_3d_many_numpy (без временных массивов)"""
+        n = pos1.shape[0]
+        out = np.empty(n)
+        for i in range(n):
+            dx = pos1[i, 0] - pos2[i, 0]
+            dy = pos1[i, 1] - pos2[i, 1]
+            dz = pos1[i, 2] - pos2[i, 2]
+            out[i] = math.sqrt(dx*dx + dy*dy + dz*dz)
+        return out
+else:
+    distance_3d_many = distance_3d_many_numpy
+
 
 class EphemerisComparison:
     """Комплексное сравнение эфемерид"""
 
-    def __init__(self):
+    def __init__(self, prefetch: bool = True):
         self.base_dir = Path(__file__).parent.parent
+        self.prefetch = prefetch
         self.results = {
             'accuracy': {},
             'performance': {},
             'intervals': {},
         }
+        self.paths = {}  # имя эфемериды -> полный путь (для дескрипторов потоков)
+        self._local = threading.local()
 
     def load_ephemeris(self, name: str, path: str) -> calceph.Ephem:
         """Загрузка эфемериды через calceph"""
@@ -64,60 +137,112 @@ class EphemerisComparison:
 
         eph = calceph.Ephem()
         eph.open(str(full_path))
+
+        # Данные файла загружаются один раз при открытии (calceph использует
+        # mmap, где это возможно), чтобы бенчмарки не измеряли чтение с диска
+        if self.prefetch and hasattr(eph, 'prefetch'):
+            eph.prefetch()
+
+        self.paths[name] = full_path
         return eph
 
-    def compute_position(self, eph: calceph.Ephem, body: int, epoch: float) -> Tuple[float, float, float]:
-        """Вычисление позиции тела"""
-        try:
-            # Barrycentric position (center=0)
-            result = eph.compute(epoch, body, 0, calceph.Constants.USE_NAIFID)
-            if result is None:
-                return None
-            return (result[0], result[1], result[2])
-        except Exception as e:
-            return None
+    def _thread_ephemeris(self, path: Path) -> calceph.Ephem:
+        """Собственный дескриптор calceph для текущего потока (открывается один раз)"""
+        handles = getattr(self._local, 'handles', None)
+        if handles is None:
+            handles = self._local.handles = {}
+        eph = handles.get(path)
+        if eph is None:
+            eph = calceph.Ephem()
+            eph.open(str(path))
+            handles[path] = eph
+        return eph
 
-    def distance_3d(self, pos1, pos2) -> float:
-        """Евклидово расстояние в 3D (AU)"""
-        if pos1 is None or pos2 is None:
-            return None
-        dx = pos1[0] - pos2[0]
-        dy = pos1[1] - pos2[1]
-        dz = pos1[2] - pos2[2]
-        return (dx*dx + dy*dy + dz*dz) ** 0.5
+    def compute_positions(self, eph: calceph.Ephem, epochs: Sequence[float], bodies: Sequence[int]) -> np.ndarray:
+        """Позиции на сетке (эпоха × тело): массив (n_epochs, n_bodies, 3), NaN где нет данных"""
+        out = np.full((len(epochs), len(bodies), 3), np.nan)
+        compute = eph.compute
+        naifid = calceph.Constants.USE_NAIFID
+        for j, body in enumerate(bodies):
+            for i, epoch in enumerate(epochs):
+                try:
+                    result = compute(epoch, body, 0, naifid)
+                except Exception:
+                    continue  # Эпоха не покрыта файлом — остаётся NaN
+                if result is not None:
+                    out[i, j] = result[:3]
+        return out
+
+    def compute_positions_parallel(self, paths: Sequence[Path], epochs: Sequence[float],
+                                   bodies: Sequence[int]) -> List[np.ndarray]:
+        """compute_positions для нескольких файлов сразу, задачи (файл, тело) в пуле потоков
+
+        Дескриптор calceph не разделяется между потоками: каждый поток
+        открывает свой экземпляр файла (см. _thread_ephemeris).
+        """
+        jobs = [(path, body) for path in paths for body in bodies]
+
+        def job(path_body):
+            path, body = path_body
+            return self.compute_positions(self._thread_ephemeris(path), epochs, (body,))
+
+        with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as ex:
+            columns = list(ex.map(job, jobs))
+
+        n = len(bodies)
+        return [np.concatenate(columns[k*n:(k+1)*n], axis=1) for k in range(len(paths))]
 
     def benchmark_access_speed(self, name: str, eph: calceph.Ephem, iterations: int = 100) -> Dict:
         """Бенчмарк скорости доступа"""
         print(f"\n🔧 Бенчмарк {name}...")
 
-        times = []
-        successful = 0
+        # Расписание (эпоха, тело) строится заранее, вне замеров
+        n_epochs = len(TEST_EPOCHS)
+        n_bodies = len(BODY_KEYS)
+        schedule = [(TEST_EPOCHS[i % n_epochs], BODY_KEYS[i % n_bodies])
+                    for i in range(iterations)]
+
+        compute = eph.compute
+        naifid = calceph.Constants.USE_NAIFID
+        clock = time.perf_counter_ns
 
-        for i in range(iterations):
-            # Случайная эпоха и тело
-            epoch = TEST_EPOCHS[i % len(TEST_EPOCHS)]
-            body = list(TEST_BODIES.keys())[i % len(TEST_BODIES)]
+        # Время каждого вызова (нс) и признак успеха
+        elapsed_ns = np.empty(iterations, dtype=np.int64)
+        ok = np.zeros(iterations, dtype=bool)
 
-            start = time.perf_counter()
-            result = self.compute_position(eph, body, epoch)
-            elapsed = time.perf_counter() - start
+        for i, (epoch, body) in enumerate(schedule):
+            start = clock()
+            try:
+                result = compute(epoch, body, 0, naifid)
+            except Exception:
+                result = None
+            elapsed_ns[i] = clock() - start
+            ok[i] = result is not None
 
-            if result is not None:
-                times.append(elapsed * 1000)  # в миллисекунды
-                successful += 1
+        successful = int(ok.sum())
+        times = elapsed_ns[ok] / 1e6  # в миллисекунды
 
-        if not times:
+        if not times.size:
             return {
                 'error': 'Нет успешных вычислений',
                 'success_rate': 0.0
             }
 
+        # Среднее — по внешнему таймеру отдельного прохода по успешным
+        # вызовам, без таймеров внутри цикла (их накладные расходы не
+        # попадают в mean_ms); медиана и разброс — по замерам выше
+        ok_schedule = [schedule[i] for i in np.flatnonzero(ok).tolist()]
+        loop_start = clock()
+        for epoch, body in ok_schedule:
+            compute(epoch, body, 0, naifid)
+        loop_ns = clock() - loop_start
+
         return {
-            'mean_ms': statistics.mean(times),
-            'median_ms': statistics.median(times),
-            'min_ms': min(times),
-            'max_ms': max(times),
-            'stdev_ms': statistics.stdev(times) if len(times) > 1 else 0,
+            'mean_ms': loop_ns / len(ok_schedule) / 1e6,
+            'median_ms': float(np.median(times)),
+            'min_ms': float(times.min()),
+            'max_ms': float(times.max()),
+            'stdev_ms': float(times.std(ddof=1)) if times.size > 1 else 0.0,
             'success_rate': (successful / iterations) * 100,
             'total_iterations': iterations,
         }
@@ -127,73 +252,90 @@ class EphemerisComparison:
         """Сравнение точности с эталоном"""
         print(f"\n📊 Сравнение {test_name} vs {reference_name}...")
 
-        errors = []
-        body_errors = {body: [] for body in TEST_BODIES}
-
-        for epoch in TEST_EPOCHS:
-            for body_id, body_name in TEST_BODIES.items():
-                ref_pos = self.compute_position(reference_eph, body_id, epoch)
-                test_pos = self.compute_position(test_eph, body_id, epoch)
-
-                if ref_pos and test_pos:
-                    error_au = self.distance_3d(ref_pos, test_pos)
-                    error_km = error_au * 149597870.7  # AU to km
-                    errors.append(error_km)
-                    body_errors[body_id].append(error_km)
-
-        if not errors:
+        # Позиции на всей сетке (эпоха × тело), NaN = нет данных;
+        # оба файла и все тела считаются параллельно
+        paths = (self.paths.get(reference_name), self.paths.get(test_name))
+        if None in paths:
+            ref = self.compute_positions(reference_eph, TEST_EPOCHS, BODY_KEYS)
+            test = self.compute_positions(test_eph, TEST_EPOCHS, BODY_KEYS)
+        else:
+            ref, test = self.compute_positions_parallel(paths, TEST_EPOCHS, BODY_KEYS)
+        ref = ref.reshape(-1, 3)
+        test = test.reshape(-1, 3)
+
+        # Ошибки одной векторной операцией
+        errors_km = distance_3d_many(ref, test) * AU_TO_KM
+        valid = ~np.isnan(errors_km)
+        errors = errors_km[valid]
+
+        if not errors.size:
             return {'error': 'Нет успешных сравнений'}
 
         # Агрегированная статистика
         result = {
-            'median_km': statistics.median(errors),
-            'mean_km': statistics.mean(errors),
-            'min_km': min(errors),
-            'max_km': max(errors),
-            'stdev_km': statistics.stdev(errors) if len(errors) > 1 else 0,
+            'median_km': float(np.median(errors)),
+            'mean_km': float(errors.mean()),
+            'min_km': float(errors.min()),
+            'max_km': float(errors.max()),
+            'stdev_km': float(errors.std(ddof=1)) if errors.size > 1 else 0.0,
             'body_errors': {}
         }
 
-        # По каждому телу
-        for body_id, body_name in TEST_BODIES.items():
-            if body_errors[body_id]:
-                result['body_errors'][body_name] = {
-                    'median_km': statistics.median(body_errors[body_id]),
-                    'max_km': max(body_errors[body_id]),
-                }
+        # По каждому телу: редукции по столбцам матрицы (эпоха × тело),
+        # тела без данных (весь столбец NaN) пропускаются
+        by_body = errors_km.reshape(len(TEST_EPOCHS), len(BODY_KEYS))
+        has_data = valid.reshape(by_body.shape).any(axis=0)
+        cols = by_body[:, has_data]
+        medians = np.nanmedian(cols, axis=0)
+        maxima = np.nanmax(cols, axis=0)
+        for body_id, median_km, max_km in zip(np.asarray(BODY_KEYS)[has_data], medians, maxima):
+            result['body_errors'][TEST_BODIES[int(body_id)]] = {
+                'median_km': float(median_km),
+                'max_km': float(max_km),
+            }
 
         return result
 
     def extract_intervals(self, name: str, path: str) -> Dict:
-        """Извлечение нативных интервалов через calceph_inspector"""
-        print(f"\n🔍 Извлечение интервалов {name}...")
+        """Извлечение нативных интервалов (в процессе, без calceph_inspector)
 
-        inspector_path = self.base_dir / 'vendor' / 'calceph-4.0.1' / 'install' / 'bin' / 'calceph_inspector.exe'
-        if not inspector_path.exists():
-            return {'error': 'calceph_inspector не найден'}
+        SPK (DAF): из директорий сегментов Type 2/3. Нативный бинарный файл
+        JPL (DE4xx .440 и т.п.): длина записи / число подынтервалов из IPT
+        заголовка. Земля в нативном файле не хранится (выводится из EMB и
+        Луны), поэтому для неё интервал не сообщается.
+        """
+        print(f"\n🔍 Извлечение интервалов {name}...")
 
-        import subprocess
         full_path = self.base_dir / path
 
         try:
-            result = subprocess.run(
-                [str(inspector_path), str(full_path)],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            intervals = {}
-            for line in result.stdout.splitlines():
-                # Парсим: "1           0           -3100014.50     1721425.50       1         2           Time span per record:    8 (day)"
-                if 'Time span per record' in line:
-                    parts = line.split()
-                    body_id = int(parts[0])
-                    interval_idx = parts.index('record:') + 1
-                    interval_days = float(parts[interval_idx])
-
-                    if body_id in TEST_BODIES:
-                        intervals[TEST_BODIES[body_id]] = interval_days
+            with open(full_path, 'rb') as f:
+                magic = f.read(8)
+                f.seek(0)
+
+                if not magic.startswith((b'DAF/', b'NAIF/DAF')):
+                    header = f.read(JPL_NATIVE_HEADER_OFFSET + JPL_NATIVE_HEADER['<'].size)
+                    return {TEST_BODIES[body_id]: days
+                            for body_id, days in read_jpl_native_intervals(header).items()
+                            if body_id in TEST_BODIES}
+
+                if DAF is None:
+                    return {'error': 'jplephem не установлен (нужен для SPK/DAF)'}
+
+                intervals = {}
+                daf = DAF(f)
+                # Сводки DAF: (start_sec, end_sec, target, center, frame,
+                # data_type, start_i, end_i)
+                for _, values in daf.summaries():
+                    body_id = int(values[2])
+                    data_type = int(values[5])
+                    end_i = int(values[7])
+
+                    # Сегменты Type 2/3 (Чебышёв) заканчиваются директорией
+                    # [INIT, INTLEN, RSIZE, N]; INTLEN — длина записи в секундах
+                    if data_type in (2, 3) and body_id in TEST_BODIES:
+                        _, interval_sec, _, _ = daf.read_array(end_i - 3, end_i)
+                        intervals[TEST_BODIES[body_id]] = interval_sec / S_PER_DAY
 
             return intervals
 
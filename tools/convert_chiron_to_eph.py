@@ -13,13 +13,170 @@ Author: AI Assistant
 Date: 2025-10-30
 """
 
+import functools
 import json
+import mmap
 import struct
 import sys
 from pathlib import Path
 import numpy as np
 from scipy.interpolate import approximate_taylor_polynomial
-from numpy.polynomial.chebyshev import Chebyshev
+from scipy.linalg import solve_triangular
+from numpy.polynomial.chebyshev import chebvander
+
+try:
+    import orjson  # ~3x faster than json on numeric-heavy Horizons payloads
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+from inventory_cache import cached
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+
+@functools.lru_cache(maxsize=1)
+def _parse_horizons(input_json):
+    """Parsed Horizons JSON, shared by the two cached loaders on a cache miss"""
+    with open(input_json, 'rb') as f:
+        return _loads(f.read())
+
+
+@cached('horizons_vectors', fmt='npy')
+def load_vectors(input_json):
+    """Horizons vectors JSON -> (N, 4) float64 array of JD, X, Y, Z (AU)"""
+    data = _parse_horizons(input_json)
+    vectors = data['vectors']
+    table = np.empty((len(vectors), 4), dtype=np.float64)
+    table[:, 0] = data['epochs']
+    for i, v in enumerate(vectors):
+        table[i, 1:] = (v['x'], v['y'], v['z'])
+    return table
+
+
+@cached('horizons_metadata')
+def load_metadata(input_json):
+    """'metadata' section of a Horizons vectors JSON"""
+    return _parse_horizons(input_json)['metadata']
+
+
+def fit_intervals_numpy(op, y, out):
+    """
+    Apply the least-squares operator of the shared design matrix to every
+    full interval at once.
+
+    op:  (degree+1, P) operator R^-1 Q^T
+    y:   (N, P, 3) positions of N intervals of P points
+    out: (N, 3, degree+1) coefficients, written in place
+    """
+    out[:] = np.matmul(op, y).transpose(0, 2, 1)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def fit_intervals(op, y, out):
+        """fit_intervals_numpy() with intervals spread over cores"""
+        n_coef, n_pts = op.shape
+        for i in prange(y.shape[0]):
+            for c in range(3):
+                for k in range(n_coef):
+                    acc = 0.0
+                    for p in range(n_pts):
+                        acc += op[k, p] * y[i, p, c]
+                    out[i, c, k] = acc
+else:
+    fit_intervals = fit_intervals_numpy
+
+
+def fit_series(epochs, xyz, degree, points_per_interval):
+    """
+    Fit consecutive runs of points_per_interval samples with Chebyshev
+    series of the given degree (the last run may be shorter).
+
+    Returns:
+        (coeffs, num_uneven): coefficients of shape (num_intervals, 3,
+        degree+1) and the number of full intervals that were not evenly
+        spaced (refit individually)
+    """
+    num_points = len(epochs)
+    num_intervals = (num_points + points_per_interval - 1) // points_per_interval
+
+    # Full intervals of an evenly spaced series all map to the same
+    # nodes in [-1, 1], so the least-squares design matrix is shared:
+    # factor it once (V = QR) and turn it into one operator R^-1 Q^T
+    t_canonical = np.linspace(-1.0, 1.0, points_per_interval)
+    q, r = np.linalg.qr(chebvander(t_canonical, degree))
+    op = solve_triangular(r, q.T)
+
+    coeffs = np.empty((num_intervals, 3, degree + 1), dtype=np.float64)
+
+    # Fit all full intervals in one batched call (X, Y, Z together)
+    num_full = num_points // points_per_interval
+    full_epochs = epochs[:num_full * points_per_interval].reshape(num_full, points_per_interval)
+    full_xyz = xyz[:num_full * points_per_interval].reshape(num_full, points_per_interval, 3)
+    t_full = 2.0 * (full_epochs - full_epochs[:, :1]) / (full_epochs[:, -1:] - full_epochs[:, :1]) - 1.0
+    uniform = np.all(np.abs(t_full - t_canonical) <= 1e-9, axis=1)
+    fit_intervals(op, full_xyz, coeffs[:num_full])
+
+    # Short last interval or uneven spacing: direct least squares on the
+    # interval's own design matrix
+    refit = np.flatnonzero(~uniform).tolist() + list(range(num_full, num_intervals))
+    for i in refit:
+        start_idx = i * points_per_interval
+        end_idx = min(start_idx + points_per_interval, num_points)
+        interval_epochs = epochs[start_idx:end_idx]
+        jd_start = interval_epochs[0]
+        jd_end = interval_epochs[-1]
+        if jd_end > jd_start:
+            t_normalized = 2.0 * (interval_epochs - jd_start) / (jd_end - jd_start) - 1.0
+        else:
+            t_normalized = np.full(1, -1.0)  # Single-sample last interval
+        cheb_xyz, *_ = np.linalg.lstsq(
+            chebvander(t_normalized, degree), xyz[start_idx:end_idx], rcond=None)
+        coeffs[i] = cheb_xyz.T
+
+    return coeffs, num_full - int(uniform.sum())
+
+
+def holdout_errors(epochs, xyz, degree, points_per_interval):
+    """
+    Out-of-sample position errors (AU) for a (degree, points_per_interval)
+    setting, used to compare settings without rewarding overfitting.
+
+    Each interval of a full-resolution fit is refit over the same
+    [jd_start, jd_end] on its even samples plus its last sample (so no
+    held-out sample lies outside the fitted data), and evaluated at the
+    remaining odd samples. Intervals with fewer than degree+1 fit samples
+    (a short tail) are skipped.
+    """
+    num_points = len(epochs)
+    errors = []
+    for start_idx in range(0, num_points, points_per_interval):
+        end_idx = min(start_idx + points_per_interval, num_points)
+        interval_epochs = epochs[start_idx:end_idx]
+        n = end_idx - start_idx
+
+        fit_mask = np.zeros(n, dtype=bool)
+        fit_mask[::2] = True
+        fit_mask[-1] = True
+        if fit_mask.sum() < degree + 1 or fit_mask.all():
+            continue  # Underdetermined, or nothing held out
+
+        jd_start = interval_epochs[0]
+        jd_end = interval_epochs[-1]
+        t_normalized = 2.0 * (interval_epochs - jd_start) / (jd_end - jd_start) - 1.0
+        vander = chebvander(t_normalized, degree)
+        interval_xyz = xyz[start_idx:end_idx]
+
+        cheb_xyz, *_ = np.linalg.lstsq(vander[fit_mask], interval_xyz[fit_mask], rcond=None)
+        held_out = ~fit_mask
+        errors.append(np.linalg.norm(interval_xyz[held_out] - vander[held_out] @ cheb_xyz, axis=1))
+
+    return np.concatenate(errors) if errors else np.empty(0)
 
 
 class ChironEphConverter:
@@ -32,7 +189,18 @@ class ChironEphConverter:
     BODY_ENTRY_SIZE = 36  # 4 (id) + 24 (name) + 8 (offset) - MUST match EphReader!
     INTERVAL_ENTRY_SIZE = 16
 
-    def __init__(self, input_json, output_eph, chebyshev_degree=13):
+    # Fixed header prefix: magic, version, num_bodies, num_intervals,
+    # interval_days, start_jd, end_jd, degree (padded to HEADER_SIZE)
+    _HEADER_STRUCT = struct.Struct('<4sIIIdddI')
+    # Body entry: id, name (24 bytes, null-padded), data offset
+    _BODY_STRUCT = struct.Struct('<i24sQ')
+
+    # auto_tune() search grid (includes the default 13 / 32)
+    TUNE_DEGREES = (10, 12, 13, 14, 16)
+    TUNE_POINTS = (16, 24, 32, 48, 64)
+    DEFAULT_TUNING = (13, 32)
+
+    def __init__(self, input_json, output_eph, chebyshev_degree=13, points_per_interval=32):
         """
         Initialize converter.
 
@@ -40,21 +208,34 @@ class ChironEphConverter:
             input_json: Path to chiron_vectors_jpl.json
             output_eph: Path to output .eph file
             chebyshev_degree: Degree of Chebyshev polynomials (default: 13)
+            points_per_interval: Input points per interval (default: 32,
+                i.e. 512 days at a 16-day step)
         """
         self.input_json = Path(input_json)
         self.output_eph = Path(output_eph)
         self.degree = chebyshev_degree
+        self.points_per_interval = points_per_interval
 
         self.data = None
+        self.epochs = None
+        self.xyz = None  # (N, 3) heliocentric positions, AU
         self.intervals = []
-        self.coefficients = []
+        self.interval_slices = []  # (start_idx, end_idx) into epochs/xyz per interval
+        self.coefficients = None  # (num_intervals, 3 * (degree+1)): X, Y, Z blocks per row
 
     def load_json(self):
         """Load JPL Horizons vectors from JSON."""
         print(f"Loading data from: {self.input_json}")
 
-        with open(self.input_json, 'r') as f:
-            self.data = json.load(f)
+        # Parsed arrays and metadata are cached on disk (keyed by the JSON's
+        # path, mtime and size), so repeated conversions skip the JSON parse
+        input_json = str(self.input_json)
+        table = load_vectors(input_json)
+        self.data = {'metadata': load_metadata(input_json)}
+        _parse_horizons.cache_clear()
+
+        self.epochs = np.ascontiguousarray(table[:, 0])
+        self.xyz = np.ascontiguousarray(table[:, 1:])
 
         metadata = self.data['metadata']
         num_points = metadata['num_points']
@@ -74,17 +255,10 @@ class ChironEphConverter:
         """
         print(f"Fitting Chebyshev polynomials (degree {self.degree})...")
 
-        epochs = np.array(self.data['epochs'])
-        vectors = self.data['vectors']
-
-        # Extract position arrays
-        x_vals = np.array([v['x'] for v in vectors])
-        y_vals = np.array([v['y'] for v in vectors])
-        z_vals = np.array([v['z'] for v in vectors])
+        epochs = self.epochs
 
         # Determine interval size (number of points per interval)
-        # For 16-day step, use ~32 points per interval (512 days, ~1.4 years)
-        points_per_interval = 32
+        points_per_interval = self.points_per_interval
         step_days = self.data['metadata']['step_days']
         interval_days = points_per_interval * step_days
 
@@ -96,93 +270,106 @@ class ChironEphConverter:
         print(f"  Creating {num_intervals} intervals...")
         print()
 
+        coeffs_xyz, num_uneven = fit_series(epochs, self.xyz, self.degree, points_per_interval)
+        self.coefficients = coeffs_xyz.reshape(num_intervals, 3 * (self.degree + 1))
+
         for i in range(num_intervals):
             start_idx = i * points_per_interval
             end_idx = min(start_idx + points_per_interval, num_points)
 
-            # Get interval data
-            interval_epochs = epochs[start_idx:end_idx]
-            interval_x = x_vals[start_idx:end_idx]
-            interval_y = y_vals[start_idx:end_idx]
-            interval_z = z_vals[start_idx:end_idx]
-
-            jd_start = interval_epochs[0]
-            jd_end = interval_epochs[-1]
-
-            # Normalize time to [-1, 1] for Chebyshev
-            t_normalized = 2.0 * (interval_epochs - jd_start) / (jd_end - jd_start) - 1.0
-
-            # Fit Chebyshev polynomials for X, Y, Z
-            cheb_x = Chebyshev.fit(t_normalized, interval_x, self.degree)
-            cheb_y = Chebyshev.fit(t_normalized, interval_y, self.degree)
-            cheb_z = Chebyshev.fit(t_normalized, interval_z, self.degree)
-
             # Store interval metadata
             self.intervals.append({
-                'jd_start': jd_start,
-                'jd_end': jd_end,
-                'num_points': len(interval_epochs)
+                'jd_start': epochs[start_idx],
+                'jd_end': epochs[end_idx - 1],
+                'num_points': end_idx - start_idx
             })
+            self.interval_slices.append((start_idx, end_idx))
 
-            # Store coefficients (degree+1 coefficients for each of X, Y, Z)
-            coeffs = np.concatenate([
-                cheb_x.coef,
-                cheb_y.coef,
-                cheb_z.coef
-            ])
-            self.coefficients.append(coeffs)
+        print(f"  Fitted {num_intervals} intervals "
+              f"({num_uneven} uneven, {num_intervals - num_points // points_per_interval} partial)")
+        print()
 
-            if (i + 1) % 10 == 0 or (i + 1) == num_intervals:
-                print(f"  Processed interval {i+1}/{num_intervals}")
+    def file_size(self, degree, points_per_interval):
+        """Size in bytes of the .eph file for the loaded data and these settings"""
+        num_intervals = (len(self.epochs) + points_per_interval - 1) // points_per_interval
+        interval_bytes = self.INTERVAL_ENTRY_SIZE + 8 * 3 * (degree + 1)
+        return self.HEADER_SIZE + self.BODY_ENTRY_SIZE + num_intervals * interval_bytes
 
+    def auto_tune(self, target_km=1.0):
+        """
+        Choose degree and points_per_interval for the loaded data: the
+        smallest file whose out-of-sample RMS error stays within target_km
+        (or the default 13 / 32 if none does, falling back to the most
+        accurate setting when the input is too short for the default).
+
+        The choice is cached per input file (path, mtime, size) and target.
+        """
+        print(f"Auto-tuning degree / interval size (target RMS {target_km} km)...")
+
+        def sweep(_input_json):
+            candidates = []
+            for degree in self.TUNE_DEGREES:
+                for points in self.TUNE_POINTS:
+                    if points // 2 < degree:
+                        continue  # Holdout fit would be underdetermined
+                    errors = holdout_errors(self.epochs, self.xyz, degree, points)
+                    if len(errors) == 0:
+                        continue
+                    candidates.append({
+                        'degree': degree,
+                        'points_per_interval': points,
+                        'rms_km': float(np.sqrt(np.mean(errors**2))) * 149597870.7,
+                        'size_bytes': self.file_size(degree, points),
+                    })
+            if not candidates:
+                raise ValueError(f"Too few points ({len(self.epochs)}) to tune any "
+                                 f"degree / interval size setting")
+            within = [c for c in candidates if c['rms_km'] <= target_km]
+            if within:
+                return min(within, key=lambda c: (c['size_bytes'], c['rms_km']))
+            # Nothing meets the target: keep the default setting, or the most
+            # accurate one when the default was skipped (short input)
+            return next((c for c in candidates
+                         if (c['degree'], c['points_per_interval']) == self.DEFAULT_TUNING),
+                        min(candidates, key=lambda c: c['rms_km']))
+
+        # version 2: holdout fits share the real intervals' spans, tails skipped
+        namespace = f"chiron_tune|{target_km}|{self.TUNE_DEGREES}|{self.TUNE_POINTS}"
+        best = cached(namespace, version=2)(sweep)(str(self.input_json))
+
+        self.degree = best['degree']
+        self.points_per_interval = best['points_per_interval']
+
+        print(f"  Degree {self.degree}, {self.points_per_interval} points per interval: "
+              f"holdout RMS {best['rms_km']:.3f} km, {best['size_bytes'] / 1024:.1f} KB")
         print()
 
     def compute_rms_error(self):
         """Compute RMS error of Chebyshev fit."""
         print("Computing RMS error...")
 
-        epochs = np.array(self.data['epochs'])
-        vectors = self.data['vectors']
+        epochs = self.epochs
+        n_per_coord = self.degree + 1
 
-        x_vals = np.array([v['x'] for v in vectors])
-        y_vals = np.array([v['y'] for v in vectors])
-        z_vals = np.array([v['z'] for v in vectors])
-
-        errors = []
-
-        for i, interval in enumerate(self.intervals):
-            # Find points in this interval
-            mask = (epochs >= interval['jd_start']) & (epochs <= interval['jd_end'])
-            interval_epochs = epochs[mask]
-
-            # Normalize time
-            jd_start = interval['jd_start']
-            jd_end = interval['jd_end']
-            t_normalized = 2.0 * (interval_epochs - jd_start) / (jd_end - jd_start) - 1.0
+        # Intervals are contiguous index ranges of the input: expand them to
+        # a per-point interval index and evaluate every point in one pass
+        lengths = np.array([end_idx - start_idx for start_idx, end_idx in self.interval_slices])
+        idx = np.repeat(np.arange(len(lengths)), lengths)
+        covered = slice(self.interval_slices[0][0], self.interval_slices[-1][1])
 
-            # Extract coefficients
-            coeffs = self.coefficients[i]
-            n_per_coord = self.degree + 1
+        jd_start = np.array([iv['jd_start'] for iv in self.intervals])[idx]
+        jd_end = np.array([iv['jd_end'] for iv in self.intervals])[idx]
+        span = jd_end - jd_start
+        t_normalized = 2.0 * np.divide(epochs[covered] - jd_start, span,
+                                       out=np.zeros_like(span), where=span > 0) - 1.0
 
-            cheb_x = Chebyshev(coeffs[0:n_per_coord])
-            cheb_y = Chebyshev(coeffs[n_per_coord:2*n_per_coord])
-            cheb_z = Chebyshev(coeffs[2*n_per_coord:3*n_per_coord])
+        # X, Y, Z of all points: Chebyshev basis (N, degree+1) against each
+        # point's coefficient block (N, 3, degree+1)
+        coeffs_xyz = self.coefficients.reshape(-1, 3, n_per_coord)
+        xyz_fit = np.einsum('nk,nck->nc', chebvander(t_normalized, self.degree), coeffs_xyz[idx])
 
-            # Evaluate polynomials
-            x_fit = cheb_x(t_normalized)
-            y_fit = cheb_y(t_normalized)
-            z_fit = cheb_z(t_normalized)
-
-            # Compute errors
-            x_err = x_vals[mask] - x_fit
-            y_err = y_vals[mask] - y_fit
-            z_err = z_vals[mask] - z_fit
-
-            # Position error magnitude (in AU)
-            pos_err = np.sqrt(x_err**2 + y_err**2 + z_err**2)
-            errors.extend(pos_err)
-
-        errors = np.array(errors)
+        # Position error magnitude (in AU)
+        errors = np.linalg.norm(self.xyz[covered] - xyz_fit, axis=1)
         rms_au = np.sqrt(np.mean(errors**2))
         max_au = np.max(errors)
 
@@ -203,69 +390,50 @@ class ChironEphConverter:
 
         self.output_eph.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(self.output_eph, 'wb') as f:
-            # Write header (512 bytes)
-            header = bytearray(self.HEADER_SIZE)
-
-            # Magic + version
-            header[0:4] = self.MAGIC
-            struct.pack_into('<I', header, 4, self.VERSION)
-
-            # Counts
-            num_bodies = 1  # Only Chiron
-            num_intervals = len(self.intervals)
-            struct.pack_into('<I', header, 8, num_bodies)
-            struct.pack_into('<I', header, 12, num_intervals)
-
-            # Interval parameters
-            first_interval = self.intervals[0]
-            last_interval = self.intervals[-1]
-            interval_days = last_interval['jd_end'] - first_interval['jd_start']
-            interval_days /= num_intervals  # Average interval length
-
-            struct.pack_into('<d', header, 16, interval_days)
-            struct.pack_into('<d', header, 24, first_interval['jd_start'])
-            struct.pack_into('<d', header, 32, last_interval['jd_end'])
-
-            # Coefficient degree
-            struct.pack_into('<I', header, 40, self.degree)
-
-            # Reserved space (464 bytes)
-
-            f.write(header)
-
-            # Write body table (36 bytes per body)
-            body_entry = bytearray(self.BODY_ENTRY_SIZE)
-
-            # Body ID (Chiron = 2060)
-            struct.pack_into('<i', body_entry, 0, 2060)
-
-            # Body name (24 bytes, null-terminated)
-            name = b'Chiron\0'
-            body_entry[4:4+len(name)] = name
-
-            # Data offset (after header + body table + interval index)
-            data_offset = self.HEADER_SIZE + self.BODY_ENTRY_SIZE
-            data_offset += num_intervals * self.INTERVAL_ENTRY_SIZE
-            struct.pack_into('<Q', body_entry, 28, data_offset)  # offset at byte 28, not 32
-
-            f.write(body_entry)
-
-            # Write interval index (16 bytes per interval)
-            for interval in self.intervals:
-                index_entry = struct.pack('<dd',
-                    interval['jd_start'],
-                    interval['jd_end']
+        num_bodies = 1  # Only Chiron
+        num_intervals = len(self.intervals)
+
+        jd_starts = np.array([iv['jd_start'] for iv in self.intervals])
+        jd_ends = np.array([iv['jd_end'] for iv in self.intervals])
+
+        # Average interval length
+        interval_days = (jd_ends[-1] - jd_starts[0]) / num_intervals
+
+        # Region offsets: header (512 bytes), body table (36 bytes per
+        # body), interval index (16 bytes per interval), coefficients
+        # ([3 * (degree+1)] doubles per interval)
+        index_offset = self.HEADER_SIZE + num_bodies * self.BODY_ENTRY_SIZE
+        data_offset = index_offset + num_intervals * self.INTERVAL_ENTRY_SIZE
+        total_size = data_offset + self.coefficients.size * 8
+
+        # Map the output file at its final size and fill each region in
+        # place; the reserved header space stays zero from truncate()
+        with open(self.output_eph, 'w+b') as f:
+            f.truncate(total_size)
+            with mmap.mmap(f.fileno(), total_size) as mm:
+                self._HEADER_STRUCT.pack_into(
+                    mm, 0,
+                    self.MAGIC, self.VERSION, num_bodies, num_intervals,
+                    interval_days, jd_starts[0], jd_ends[-1], self.degree,
                 )
-                f.write(index_entry)
+                self._BODY_STRUCT.pack_into(
+                    mm, self.HEADER_SIZE, 2060, b'Chiron', data_offset)  # Chiron = 2060
 
-            # Write coefficients (packed doubles)
-            coeffs_per_interval = 3 * (self.degree + 1)  # X, Y, Z
+                index = np.frombuffer(mm, dtype='<f8', count=num_intervals * 2,
+                                      offset=index_offset).reshape(num_intervals, 2)
+                index[:, 0] = jd_starts
+                index[:, 1] = jd_ends
 
-            for coeffs in self.coefficients:
-                # Pack as doubles
-                packed = struct.pack(f'<{len(coeffs)}d', *coeffs)
-                f.write(packed)
+                # Coefficients stay float64: the constant terms are ~8-19 AU,
+                # where float32 spacing (1-2e-6 AU, 140-285 km) alone is far
+                # above the 1 km accuracy target
+                coeffs = np.frombuffer(mm, dtype='<f8', count=self.coefficients.size,
+                                       offset=data_offset).reshape(self.coefficients.shape)
+                coeffs[...] = self.coefficients
+
+                # Release the views before the map is closed
+                del index, coeffs
+                mm.flush()
 
         # Report size
         size_kb = self.output_eph.stat().st_size / 1024
@@ -282,6 +450,10 @@ class ChironEphConverter:
         # Load JSON data
         self.load_json()
 
+        # Pick degree / interval size when not given
+        if self.degree is None:
+            self.auto_tune()
+
         # Fit Chebyshev polynomials
         self.fit_chebyshev_intervals()
 
@@ -322,7 +494,8 @@ def main():
         output_eph = "data/chiron/chiron_jpl.eph"
 
     if len(sys.argv) > 3:
-        degree = int(sys.argv[3])
+        # 'auto' searches degree and interval size (see auto_tune)
+        degree = None if sys.argv[3] == 'auto' else int(sys.argv[3])
     else:
         degree = 13  # Default degree
 
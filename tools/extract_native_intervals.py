@@ -9,6 +9,8 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+import numpy as np
+
 # NAIF ID -> имя тела
 BODY_NAMES = {
     1: "Mercury", 2: "Venus", 3: "EMB", 4: "Mars", 5: "Jupiter",
@@ -28,8 +30,8 @@ def read_daf_summary(file_path: str) -> Dict[int, List[float]]:
 
     Структура SPK Type 2 (Chebyshev):
     - Каждый сегмент содержит массив коэффициентов
-    - В конце массива идёт directory с временными границами
-    - Анализируем разницу между последовательными временными метками
+    - В конце массива идёт directory [INIT, INTLEN, RSIZE, N];
+      INTLEN — длина интервала одной записи в секундах
     """
 
     intervals_by_body = {}
@@ -44,23 +46,23 @@ def read_daf_summary(file_path: str) -> Dict[int, List[float]]:
             print(f"⚠️  Not a DAF file: {format_id}")
             return intervals_by_body
 
-        # Определяем endianness
-        # Байты 88-91 содержат ND (number of double precision)
-        # Байты 92-95 содержат NI (number of integers)
-        nd = struct.unpack('>i', file_record[88:92])[0]
-        ni = struct.unpack('>i', file_record[92:96])[0]
-
-        # Если значения слишком большие, пробуем little-endian
-        if nd > 100 or ni > 100:
-            nd = struct.unpack('<i', file_record[88:92])[0]
-            ni = struct.unpack('<i', file_record[92:96])[0]
+        # Определяем endianness по LOCFMT (байты 88-95: 'LTL-IEEE' / 'BIG-IEEE');
+        # в старых файлах поле пустое — тогда по правдоподобию ND/NI
+        locfmt = file_record[88:96]
+        if locfmt == b'LTL-IEEE':
             endian = '<'
-        else:
+        elif locfmt == b'BIG-IEEE':
             endian = '>'
+        else:
+            endian = '>' if 0 < struct.unpack('>i', file_record[8:12])[0] <= 124 else '<'
+
+        # Байты 8-11 содержат ND (number of double precision)
+        # Байты 12-15 содержат NI (number of integers)
+        nd, ni = struct.unpack(f'{endian}2i', file_record[8:16])
 
         print(f"File format: {format_id}, ND={nd}, NI={ni}, endian={'little' if endian == '<' else 'big'}")
 
-        # Forward record pointer (байты 76-79)
+        # Forward record pointer (байты 76-79) — первая запись сводок
         fward_ptr = struct.unpack(f'{endian}i', file_record[76:80])[0]
 
         # Backward record pointer (байты 80-83)
@@ -68,86 +70,52 @@ def read_daf_summary(file_path: str) -> Dict[int, List[float]]:
 
         print(f"Forward ptr: {fward_ptr}, Backward ptr: {bward_ptr}")
 
-        # Читаем summary records
-        # Каждый summary record = 1024 bytes
-        # Первые 24 байта - next/prev pointers
-        # Остальное - summary entries
-
-        current_record = 2  # Первый summary record после file record
-
-        while current_record <= bward_ptr:
+        # Каждый summary record = 1024 bytes: 3 double (next, prev, число
+        # сводок), затем сводки. Сводка — ND double и NI упакованных int32,
+        # дополненных до целого числа double: ND + (NI+1)//2 double
+        # (для SPK: 2 + 3 = 5)
+        f64 = np.dtype(f'{endian}f8')
+        summary_doubles = nd + (ni + 1) // 2
+        summary_dtype = np.dtype({
+            'names': ['dc', 'ic'],
+            'formats': [(f'{endian}f8', (nd,)), (f'{endian}i4', (ni,))],
+            'offsets': [0, nd * 8],
+            'itemsize': summary_doubles * 8,
+        })
+
+        current_record = fward_ptr
+        while current_record != 0:
             f.seek((current_record - 1) * 1024)
             summary_record = f.read(1024)
 
-            # Next pointer
-            next_ptr = struct.unpack(f'{endian}d', summary_record[0:8])[0]
-            # Prev pointer
-            prev_ptr = struct.unpack(f'{endian}d', summary_record[8:16])[0]
-            # Number of summaries in this record
-            n_summaries = int(struct.unpack(f'{endian}d', summary_record[16:24])[0])
-
-            if n_summaries == 0:
-                break
-
-            # Каждый summary: ND doubles + NI integers + 2 integers (begin/end addresses)
-            summary_size = (nd + ni + 2) * 8  # все в doubles
-
-            offset = 24  # После заголовка
-
-            for i in range(n_summaries):
-                if offset + summary_size > 1024:
-                    break
-
-                summary_data = summary_record[offset:offset + summary_size]
-
-                # Первые ND doubles - временной диапазон
-                start_time = struct.unpack(f'{endian}d', summary_data[0:8])[0]
-                end_time = struct.unpack(f'{endian}d', summary_data[8:16])[0]
-
-                # Следующие NI integers - target, center, frame, type, begin_addr, end_addr
-                # Они хранятся как doubles!
-                target_offset = nd * 8
-                target_id = int(struct.unpack(f'{endian}d', summary_data[target_offset:target_offset+8])[0])
-
-                center_id = int(struct.unpack(f'{endian}d', summary_data[target_offset+8:target_offset+16])[0])
-
-                frame_id = int(struct.unpack(f'{endian}d', summary_data[target_offset+16:target_offset+24])[0])
-
-                spk_type = int(struct.unpack(f'{endian}d', summary_data[target_offset+24:target_offset+32])[0])
-
-                begin_addr = int(struct.unpack(f'{endian}d', summary_data[target_offset+32:target_offset+40])[0])
-
-                end_addr = int(struct.unpack(f'{endian}d', summary_data[target_offset+40:target_offset+48])[0])
-
-                # Читаем данные сегмента для Type 2 (Chebyshev)
-                if spk_type == 2:
-                    # Читаем последние записи сегмента - там directory
-                    segment_size = end_addr - begin_addr + 1
-
-                    # Переходим к началу сегмента данных
-                    f.seek((begin_addr - 1) * 8)
+            # Next pointer, prev pointer, число сводок в записи
+            next_ptr, prev_ptr, n_summaries = np.frombuffer(summary_record, dtype=f64, count=3)
+            n_summaries = min(int(n_summaries), (128 - 3) // summary_doubles)
 
-                    # Читаем первые несколько double для определения структуры
-                    first_doubles = struct.unpack(f'{endian}10d', f.read(80))
+            # Все сводки записи одним массивом; поля берутся столбцами
+            summaries = np.frombuffer(summary_record, dtype=summary_dtype,
+                                      count=n_summaries, offset=3 * 8)
 
-                    # first_doubles[0] = начало первого интервала (TDB seconds)
-                    # first_doubles[1] = конец первого интервала
-                    # first_doubles[2] = rsize (количество double в одной записи)
+            # Целые поля SPK: target, center, frame, type, begin_addr, end_addr
+            ic = summaries['ic']
+            target_ids = ic[:, 0]
+            spk_types = ic[:, 3]
+            end_addrs = ic[:, 5]
 
-                    interval_start = first_doubles[0]
-                    interval_end = first_doubles[1]
-                    interval_length_sec = interval_end - interval_start
-                    interval_length_days = interval_length_sec / 86400.0
+            # Данные сегмента читаются только для Type 2 (Chebyshev)
+            for i in np.flatnonzero(spk_types == 2).tolist():
+                target_id = int(target_ids[i])
 
-                    if target_id not in intervals_by_body:
-                        intervals_by_body[target_id] = []
+                # Directory — последние 4 double сегмента (адреса end-3..end)
+                f.seek((int(end_addrs[i]) - 4) * 8)
+                init, interval_length_sec, rsize, n_records = np.frombuffer(f.read(32), dtype=f64)
 
-                    intervals_by_body[target_id].append(interval_length_days)
+                interval_length_days = float(interval_length_sec / 86400.0)
 
-                offset += summary_size
+                if target_id not in intervals_by_body:
+                    intervals_by_body[target_id] = []
 
-            if next_ptr == 0:
-                break
+                intervals_by_body[target_id].append(interval_length_days)
 
             current_record = int(next_ptr)
 
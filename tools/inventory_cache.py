@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for per-file SPK inventory results.
+
+Parsing the segment table of a multi-GB BSP (DE431, EPM2021) takes from
+hundreds of milliseconds to seconds, while the result is a small table of
+records. (The Chiron converter reuses it for arrays parsed from Horizons
+JSON dumps.) Results are stored in ~/.cache/ephreader/inventory/, keyed
+by (namespace, version, absolute path, mtime, size): any change to the
+file produces a new key. The version is part of each producer's
+@cached() call and must be bumped whenever the producer's output
+changes for the same file, otherwise results of the old code are reused.
+
+Two storage formats:
+- 'json': any JSON-serializable result
+- 'npy':  a NumPy (structured) array, saved with np.save (no pickle)
+
+Usage:
+    from inventory_cache import cached
+
+    @cached('inventory_spice', fmt='npy', version=2)
+    def scan_file(filepath):
+        ...  # must return a NumPy array
+
+Set `inventory_cache.enabled = False` (e.g. from a --no-cache flag) to
+bypass the cache for a run.
+"""
+
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'ephreader' / 'inventory'
+
+enabled = True
+
+
+def cache_key(filepath: str, namespace: str = '', version: int = 1) -> str:
+    """Cache key for a file: changes whenever its path, mtime or size (or the producer version) changes"""
+    st = os.stat(filepath)
+    raw = f"{namespace}|v{version}|{os.path.abspath(filepath)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def set_enabled(flag: bool):
+    """Enable/disable the cache (usable as a process-pool initializer)"""
+    global enabled
+    enabled = flag
+
+
+def _load(cache_file: Path, fmt: str):
+    if fmt == 'npy':
+        import numpy as np
+        return np.load(cache_file, allow_pickle=False)
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _dump(result, tmp_file: Path, fmt: str):
+    if fmt == 'npy':
+        import numpy as np
+        with open(tmp_file, 'wb') as f:
+            np.save(f, result, allow_pickle=False)
+    else:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+
+
+def cached(namespace: str, fmt: str = 'json', version: int = 1):
+    """
+    Decorator: memoize func(filepath) on disk, keyed by cache_key().
+
+    Bump version whenever func's result for an unchanged file changes.
+    """
+    if fmt not in ('json', 'npy'):
+        raise ValueError(f"Unknown cache format: {fmt}")
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(filepath, *args, **kwargs):
+            if not enabled:
+                return func(filepath, *args, **kwargs)
+
+            cache_file = CACHE_DIR / f"{cache_key(filepath, namespace, version)}.{fmt}"
+
+            try:
+                return _load(cache_file, fmt)
+            except (OSError, ValueError):
+                pass  # Miss or unreadable entry: recompute
+
+            result = func(filepath, *args, **kwargs)
+
+            # Write atomically so a concurrent reader never sees a partial file
+            try:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+                _dump(result, tmp_file, fmt)
+                os.replace(tmp_file, cache_file)
+            except OSError:
+                pass  # Cache is best-effort
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Segment-table scan of SPK (DAF) files shared by the inventory scripts.
+
+The file is opened through a read-only shared mapping (pages stay in the
+OS page cache and are shared with other processes scanning the same
+file) and only the DAF summary records are decoded, plus, on request,
+the 4-word directory that ends every Chebyshev (Type 2/3) segment. The
+file and the mapping are closed even when a corrupt file makes the parse
+raise.
+
+Usage:
+    from spk_scan import scan_segments
+
+    results, summaries, directories = scan_segments(filepath, SEGMENT_DTYPE,
+                                                    read_directories=True)
+"""
+
+import mmap
+from typing import Optional, Tuple
+
+import numpy as np
+from jplephem.daf import DAF
+from jplephem.spk import S_PER_DAY, T0
+
+from body_names import BODY_NAMES
+
+
+def scan_segments(filepath: str, dtype: np.dtype,
+                  read_directories: bool = False) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    One record per segment of a SPICE file.
+
+    Fills the 'target', 'target_name', 'center', 'start_jd', 'end_jd' and
+    'coverage_years' fields of a new array of the given dtype; other
+    fields are left for the caller.
+
+    Returns:
+        (results, summaries, directories): summaries is the (n, 8) array of
+        (start_sec, end_sec, target, center, frame, data_type, start_i,
+        end_i); directories is (n, 4) [init, intlen, rsize, n_records] for
+        Type 2/3 segments and NaN elsewhere, or None unless requested
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)  # Large read-ahead for the segment scan
+        daf = DAF(mm)
+
+        # Summary records straight from the DAF, without building jplephem
+        # Segment objects, in one (n, 8) array
+        summaries = np.array([values for _, values in daf.summaries()],
+                             dtype=np.float64).reshape(-1, 8)
+
+        directories = None
+        if read_directories:
+            # SPK Type 2/3 (Chebyshev) segments end with a 4-word directory:
+            # [init (TDB seconds), intlen (seconds), rsize, n_records].
+            # Read only those 4 doubles instead of load_array(), which
+            # decodes the whole coefficient block.
+            directories = np.full((len(summaries), 4), np.nan)
+            data_types = summaries[:, 5].astype(np.int64)
+            end_words = summaries[:, 7].astype(np.int64)
+            for i in np.flatnonzero((data_types == 2) | (data_types == 3)).tolist():
+                end_i = int(end_words[i])
+                directories[i] = daf.read_array(end_i - 3, end_i)
+
+    targets = summaries[:, 2].astype(np.int64)
+
+    results = np.empty(len(summaries), dtype=dtype)
+    results['target'] = targets
+    results['target_name'] = [BODY_NAMES.get(t, f"Body {t}") for t in targets.tolist()]
+    results['center'] = summaries[:, 3]
+
+    # Coverage: whole-column ops instead of per-segment math
+    results['start_jd'] = T0 + summaries[:, 0] / S_PER_DAY
+    results['end_jd'] = T0 + summaries[:, 1] / S_PER_DAY
+    results['coverage_years'] = (results['end_jd'] - results['start_jd']) / 365.25
+
+    return results, summaries, directories